@@ -3,7 +3,7 @@ The MIT License (MIT)
 Copyright © 2021 Walkline Wang (https://walkline.wang)
 https://gitee.com/walkline/remote-wol-micropython
 """
-from utils.wifihandler import WifiHandler
+from utils.identity import Identity
 
 
 class Config(object):
@@ -15,6 +15,12 @@ class Config(object):
 	HARDWARE_VERSION = VERSION_0
 	HARDWARE_NAME = "Remote WOL v0"
 
+	# 每个硬件版本加载的功能插件，对应 hardware/plugins 目录中的模块
+	PLUGINS = {
+		VERSION_0: ("wol",),
+		VERSION_1: ("wol", "temperature"),
+	}
+
 	RESET_BUTTON = 0 # GPIO0 `BOOT Button`
 	BUTTON_PRESS_TIMEOUT = 5 * 1000 # Button long press timeout
 
@@ -22,7 +28,17 @@ class Config(object):
 
 	# Version1 Settings
 	DS18B20_DATALINE = 26 # GPIO26
-	DATA_TIMER_PERIOD = 5 * 60 * 1000 # update temperature data period
+	DS18B20_RESOLUTION = 12 # 9/10/11/12 位精度，转换时间 94/188/375/750 ms，分辨率 0.5/0.25/0.125/0.0625 ℃
+	DATA_TIMER_PERIOD = 5 * 60 * 1000 # 采样间隔（ms），是否上报由下面的 REPORT_* 和 ALARM_* 决定
+	REPORT_DEADBAND = 0 # 与上次上报的数据相差达到该值（℃）才上报，为 0 且 REPORT_MIN_INTERVAL 为 0 时每次采样都上报
+	REPORT_MIN_INTERVAL = 0 # 两次上报之间的最短时间（ms），越过报警阈值时不受限制
+	REPORT_MAX_INTERVAL = 60 * 60 * 1000 # 数据没有变化时最长的上报间隔（ms），0 为不限制
+	ALARM_LOW = None # 低于该温度（℃）时立即上报，None 为不使用
+	ALARM_HIGH = None # 高于该温度（℃）时立即上报，None 为不使用
+	DATA_BATCH_SIZE = 1 # 每条消息包含的数据数量，1 为每次采样发送一条消息
+	DATA_BATCH_PERIOD = 60 * 60 * 1000 # 批量模式下最长的缓存时间（ms）
+	HISTORY_SIZE = 288 # 每个传感器缓存的数据数量，用于 query_history 命令
+	HISTORY_WINDOWS = (15 * 60, 60 * 60, 24 * 60 * 60) # 统计窗口长度（s）
 
 	LOG_FILE_LIMIT = 200 * 1024
 
@@ -42,7 +58,7 @@ class Config(object):
 	# AP 热点设置
 	"""
 	AP_SSID_PREFIX = "wol_"
-	AP_SSID = "{}{}".format(AP_SSID_PREFIX, WifiHandler.get_mac_address())
+	AP_SSID = "{}{}".format(AP_SSID_PREFIX, Identity.mac_address())
 	AP_AUTHMODE = 0
 	AP_HOST = "192.168.66.1"
 	AP_PORT = 80
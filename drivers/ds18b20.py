@@ -7,7 +7,8 @@ https://gitee.com/walkline/remote-wol-micropython
 from machine import Pin
 from onewire import OneWire
 from ds18x20 import DS18X20
-from utime import sleep_ms
+from ubinascii import hexlify
+from utime import sleep_ms, ticks_ms, ticks_diff, ticks_add
 
 
 class DS18B20Exception(BaseException):
@@ -16,40 +17,192 @@ class DS18B20Exception(BaseException):
 
 class DS18B20:
 	"""
-	DS18B20 驱动
+	DS18B20 驱动，支持同一条总线上的多个传感器
+
+	初始化时扫描一次总线并缓存 ROM 列表，之后只在读取失败、总线上没有传感器或者调用 scan() 时重新扫描
+
+	温度转换分为两步，等待转换期间不阻塞：
+	    1. start_conversion(): 向总线上所有传感器广播 convert_temp 命令，记录完成期限，立即返回
+	    2. collect(): 期限到达之后读取结果，可以使用 remaining() 获取还需等待的时间
+
+	所有传感器同时转换，等待时间与传感器数量无关
+
+	读取时检查暂存器中的配置寄存器，传感器重新上电恢复默认精度后，重新写入精度并丢弃本次结果
+
+	参数：
+	    dataline: 数据线引脚
+	    resolution: 转换精度（9~12 位），扫描到传感器时写入暂存器，等待时间随精度变化
 	"""
-	
-	def __init__(self, dataline: int):
+	# 每种精度的最长转换时间（ms）
+	CONVERSION_TIMES = {
+		9: 94,
+		10: 188,
+		11: 375,
+		12: 750,
+	}
+
+	def __init__(self, dataline: int, resolution: int=12):
 		assert dataline is not None and isinstance(dataline, int), DS18B20Exception("dataline must be a int")
+		assert resolution in self.CONVERSION_TIMES, DS18B20Exception("resolution must be 9, 10, 11 or 12")
 
 		self._oneware = OneWire(Pin(dataline))
 		self._ds18b20 = DS18X20(self._oneware)
+		self._roms = []
+		self._rom_ids = []
+		self._rescan = True
+		self._resolution = resolution
+		self._config = ((resolution - 9) << 5) | 0x1f
+		self._conversion_time = self.CONVERSION_TIMES[resolution]
+		self._deadline = None
+
+		self.scan()
 
 	def deinit(self):
 		self._ds18b20 = None
 		self._oneware = None
+		self._deadline = None
 
-	def temperature(self):
+	@property
+	def rom_ids(self):
 		"""
-		获取温度
+		缓存的传感器 ROM 编号列表（16 位十六进制字符串）
+		"""
+		return self._rom_ids
+
+	@property
+	def resolution(self):
+		return self._resolution
+
+	@property
+	def conversion_time(self):
+		return self._conversion_time
+
+	@property
+	def converting(self):
+		return self._deadline is not None
+
+	@property
+	def ready(self):
+		return self._deadline is not None and ticks_diff(ticks_ms(), self._deadline) >= 0
+
+	def scan(self):
 		"""
-		roms = self._ds18b20.scan()
-		self._ds18b20.convert_temp()
+		扫描总线并更新 ROM 列表，设置所有传感器的精度，返回 ROM 编号列表
+		"""
+		try:
+			self._roms = self._ds18b20.scan()
+		except Exception:
+			self._roms = []
+
+		for rom in self._roms:
+			try:
+				self.__write_resolution(rom)
+			except Exception:
+				# 写入失败时保留该传感器，读取时检查配置寄存器后重新写入
+				pass
+
+		self._rom_ids = [hexlify(rom).decode() for rom in self._roms]
+		self._rescan = len(self._roms) == 0
+
+		return self._rom_ids
+
+	def remaining(self):
+		"""
+		距离转换完成还需等待的时间（ms），没有开始转换时返回 0
+		"""
+		if self._deadline is None:
+			return 0
+
+		return max(0, ticks_diff(self._deadline, ticks_ms()))
+
+	def start_conversion(self):
+		"""
+		开始温度转换，返回需要等待的时间（ms），总线上没有传感器时不需要等待
+		"""
+		if self._rescan:
+			self.scan()
+
+		if self._rescan:
+			self._deadline = ticks_ms()
 
-		sleep_ms(750)
+			return 0
 
-		if len(roms) > 0:
-			temp = round(self._ds18b20.read_temp(roms[0]), 1)
+		try:
+			self._ds18b20.convert_temp()
+		except Exception:
+			self._rescan = True
+			self._deadline = ticks_ms()
+
+			return 0
+
+		self._deadline = ticks_add(ticks_ms(), self._conversion_time)
+
+		return self._conversion_time
+
+	def collect(self):
+		"""
+		读取转换结果，需要在转换完成之后调用
+
+		返回 {ROM 编号: 温度}，读取失败的传感器不包含在结果中，并在下次转换之前重新扫描总线，
+		精度与设置不同的传感器重新写入精度，本次结果不包含该传感器
+		"""
+		assert self.ready, DS18B20Exception("conversion not finished")
+
+		self._deadline = None
+		result = {}
+
+		if self._rescan:
+			return result
+
+		for index, rom in enumerate(self._roms):
+			try:
+				scratch = self._ds18b20.read_scratch(rom)
+
+				if scratch[4] == self._config:
+					result[self._rom_ids[index]] = round(self.__temperature(scratch), 1)
+				else:
+					self.__write_resolution(rom, scratch)
+			except Exception:
+				self._rescan = True
+
+		return result
+
+	@staticmethod
+	def __temperature(scratch):
+		"""
+		从暂存器中计算温度，与 ds18x20 模块的 read_temp() 相同
+		"""
+		value = scratch[1] << 8 | scratch[0]
+
+		if value & 0x8000:
+			value = -((value ^ 0xffff) + 1)
+
+		return value / 16
+
+	def __write_resolution(self, rom, scratch=None):
+		"""
+		修改暂存器中的配置寄存器，保留 TH、TL 报警值，不写入 EEPROM
+		"""
+		if scratch is None:
+			scratch = self._ds18b20.read_scratch(rom)
+
+		if scratch[4] != self._config:
+			self._ds18b20.write_scratch(rom, bytearray((scratch[2], scratch[3], self._config)))
+
+	def temperatures(self):
+		"""
+		获取所有传感器的温度，阻塞等待转换完成
+		"""
+		sleep_ms(self.start_conversion())
 
-			return temp
-		else:
-			return -237.15
+		return self.collect()
 
 
 def run_test():
 	ds18b20 = DS18B20(26)
 
-	print("temperature: {}(°C)".format(ds18b20.temperature()))
+	for rom_id, temperature in ds18b20.temperatures().items():
+		print("{}: {}(°C)".format(rom_id, temperature))
 
 if __name__ == "__main__":
 	run_test()
@@ -119,6 +119,7 @@ class Led(object):
 	    2. 自定义闪烁次数，包括无限闪烁
 	    3. 摩尔斯码闪烁
 	    4. 闪烁结束后的回调
+	    5. 在 uasyncio 事件循环中闪烁
 	
 	内置几种常用的闪烁模式：
 	    1. 快速闪烁
@@ -256,6 +257,51 @@ class Led(object):
 		"""
 		self.__blink(segments, None, repeat, trigger)
 
+	async def play(self, on_time=None, off_time=None, repeat=1, trigger=True):
+		"""
+		- 在 uasyncio 事件循环中闪烁，不创建线程
+
+		参数与 customize() 相同，on_time 为闪烁片段元组时与 combination() 相同，
+		repeat 为 0 时需要使用 stop() 或者取消 task 终止循环
+		"""
+		import uasyncio as asyncio
+
+		assert repeat >= 0, LedException("repeat must be >= 0")
+
+		if isinstance(on_time, tuple):
+			assert off_time is None, LedException("in combination mode off_time must be None")
+
+			segments = on_time
+		else:
+			assert on_time is not None, LedException("on_time must be specified")
+			assert off_time is not None, LedException("off_time must be specified")
+
+			segments = ((on_time, off_time),)
+
+		self.__terminate_loop = False
+		count = 0
+
+		try:
+			while repeat == 0 or count < repeat:
+				for segment in segments:
+					if segment[0] > 0:
+						self.__led.value(1)
+						await asyncio.sleep_ms(segment[0])
+
+					self.__led.value(0)
+					await asyncio.sleep_ms(segment[1])
+
+					if self.__terminate_loop:
+						return
+
+				count += 1
+
+			if self.__callback is not None and trigger:
+				self.__callback()
+		finally:
+			if self.__led is not None:
+				self.__led.value(0)
+
 	def stop(self):
 		"""
 		- 停止当前闪烁，不会触发回调函数
@@ -0,0 +1,140 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import json
+from utime import ticks_us
+
+
+class CommandRouterException(BaseException):
+	pass
+
+
+class CommandRouter(object):
+	"""
+	- MQTT 命令路由
+
+	使用字典保存命令名称与处理函数的对应关系，新增命令只需要调用 register()
+
+	处理函数形如 handler(json_obj, result)，result 为预先填好的通用结果，
+	返回需要发布的结果字典，返回 None 表示不发布
+
+	完整解析 JSON 之前先调用 accepts() 在原始字节中查找本设备的 MAC 地址和
+	不限定设备的命令名称，丢弃发给其它设备的消息，这一步不分配内存
+
+	参数：
+	    topic: 订阅的主题，只处理该主题的消息
+	    mac_address: 本设备的 MAC 地址
+	"""
+	def __init__(self, topic, mac_address):
+		assert topic is not None, CommandRouterException("topic must be specified")
+
+		self.__topic = topic if isinstance(topic, bytes) else topic.encode()
+		self.__mac_address = mac_address
+		self.__quoted_mac_address = b'"' + mac_address.encode() + b'"'
+		self.__handlers = {} # command: (handler, device_only)
+		self.__broadcast_patterns = () # 不限定设备的命令名称，形如 b'"wake_up_pc"'
+		self.__parsed_us = 0 # 最近一条消息解析完成的时间
+
+		self.__counters = {
+			'received': 0,
+			'filtered': 0,
+			'decoded': 0,
+		}
+
+	@property
+	def topic(self):
+		return self.__topic
+
+	@property
+	def mac_address(self):
+		return self.__mac_address
+
+	@property
+	def commands(self):
+		return list(self.__handlers.keys())
+
+	@property
+	def parsed_us(self):
+		return self.__parsed_us
+
+	def stats(self):
+		return self.__counters
+
+	def register(self, command, handler, device_only=True):
+		"""
+		- 注册命令处理函数
+
+		参数：
+		    command: 命令名称
+		    handler: 处理函数
+		    device_only: 为 True 时，消息中的 mac_address 必须是本设备才会处理
+		"""
+		assert callable(handler), CommandRouterException("handler must be callable")
+
+		self.__handlers[command] = (handler, device_only)
+		self.__update_patterns()
+
+	def unregister(self, command):
+		self.__handlers.pop(command, None)
+		self.__update_patterns()
+
+	def accepts(self, msg):
+		"""
+		- 快速过滤
+
+		原始消息中包含本设备的 MAC 地址，或者包含不限定设备的命令名称时返回 True，
+		只使用 bytes.find()，不分配内存
+		"""
+		self.__counters['received'] += 1
+
+		if msg.find(self.__quoted_mac_address) >= 0:
+			return True
+
+		for pattern in self.__broadcast_patterns:
+			if msg.find(pattern) >= 0:
+				return True
+
+		self.__counters['filtered'] += 1
+
+		return False
+
+	def dispatch(self, topic, msg):
+		"""
+		- 分发一条消息
+
+		返回值：
+		    处理函数返回的结果，不需要处理或者不需要发布时返回 None
+
+		消息格式错误时抛出 ValueError 或 KeyError
+		"""
+		if topic != self.__topic:
+			return None
+
+		self.__counters['decoded'] += 1
+
+		json_obj = json.loads(msg)
+		self.__parsed_us = ticks_us()
+		entry = self.__handlers.get(json_obj['command'])
+
+		if entry is None:
+			return None
+
+		handler, device_only = entry
+
+		if device_only and json_obj['mac_address'] != self.__mac_address:
+			return None
+
+		return handler(json_obj, {
+			'command': json_obj['command'] + '_result',
+			'mac_address': json_obj['mac_address'],
+			'result': 'success'
+		})
+
+	def __update_patterns(self):
+		self.__broadcast_patterns = tuple([
+			b'"' + command.encode() + b'"'
+			for command, (handler, device_only) in self.__handlers.items()
+			if not device_only
+		])
@@ -0,0 +1,156 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import uasyncio as asyncio
+from .hardware_exception import HardwareException
+from .mqtt_sub_callback import MQTTSubCallback
+from services.mqtt_service import MQTTService
+from services.publish_queue import PublishQueue
+from utils.utilities import Utilities
+from utils.identity import Identity
+from utils.boot_profiler import BootProfiler
+from micropython import alloc_emergency_exception_buf
+
+
+alloc_emergency_exception_buf(100)
+
+
+class HardwareConfig(object):
+	MSG_CHECK_PERIOD = 50 # 检查 MQTT 消息的间隔时间（ms）
+
+	USERNAME = Identity.username()
+	MY_TOPIC = Identity.my_topic()
+
+	DEVICE_STATUS_ONLINE_DATA = Identity.online_data()
+	DEVICE_STATUS_OFFLINE_DATA = Identity.offline_data()
+
+
+class Device(object):
+	"""
+	- 设备核心
+
+	负责 MQTT 连接、命令分发、离线发布队列和错误恢复（wifi 断开由 MQTTService 中的 LinkMonitor 处理），
+	唤醒电脑、温度上报等功能由插件提供，插件在 setup() 中注册自己的命令和任务
+	"""
+	def __init__(self):
+		self.__mqtt_client = None
+		self.__publish_queue = None
+		self.__mqtt_sub_callback = None
+		self.__online_data = HardwareConfig.DEVICE_STATUS_ONLINE_DATA
+		self.__plugins = []
+		self.__tasks = []
+		self.__starting = False
+		self.__initialized = False
+
+	@property
+	def mqtt_client(self):
+		return self.__mqtt_client
+
+	@property
+	def publish_queue(self):
+		return self.__publish_queue
+
+	@property
+	def sub_callback(self):
+		return self.__mqtt_sub_callback
+
+	@property
+	def plugins(self):
+		return self.__plugins
+
+	def add_plugin(self, plugin):
+		assert not self.__initialized, HardwareException("add plugins before setup()")
+
+		self.__plugins.append(plugin)
+
+	def setup(self):
+		"""
+		初始化设备和所有插件
+		"""
+		if self.__initialized: return
+
+		self.__mqtt_client = MQTTService()
+		self.__publish_queue = PublishQueue(self.__mqtt_client)
+
+		self.__mqtt_sub_callback = MQTTSubCallback(self.__mqtt_client, HardwareConfig.MY_TOPIC, self.__publish_queue)
+
+		self.__mqtt_client.set_callback(self.__mqtt_sub_callback.get_callback())
+		self.__mqtt_client.set_reconnect_callback(self.__reconnect_cb)
+
+		for plugin in self.__plugins:
+			plugin.setup()
+
+		self.__initialized = True
+
+	async def start(self):
+		"""
+		连接 MQTT 服务器并启动所有任务，所有服务器都不可用时按照恢复策略重试，直到连接成功或者重启设备
+		"""
+		assert self.__initialized, HardwareException("call setup() first")
+
+		self.__mqtt_client.set_last_will(HardwareConfig.MY_TOPIC, HardwareConfig.DEVICE_STATUS_OFFLINE_DATA, retain=True, qos=1)
+
+		try:
+			await self.__mqtt_client.connect()
+		except OSError as ose:
+			# 恢复成功时已经重新连接
+			await self.__mqtt_client.recover(ose)
+
+		BootProfiler.mark(BootProfiler.CONNECT)
+
+		# 先订阅再发布上线消息，控制端收到上线消息时设备已经可以接收命令
+		self.__mqtt_client.subscribe(HardwareConfig.MY_TOPIC)
+		BootProfiler.mark(BootProfiler.SUBSCRIBE)
+
+		self.__online_data = BootProfiler.attach(HardwareConfig.DEVICE_STATUS_ONLINE_DATA)
+		self.__mqtt_client.publish(HardwareConfig.MY_TOPIC, self.__online_data, retain=True, qos=1)
+
+		self.__publish_queue.start()
+
+		self.__starting = True
+		self.__tasks = [
+			asyncio.create_task(self.__msg_task()),
+		]
+
+		for plugin in self.__plugins:
+			plugin.start()
+
+	def stop(self):
+		if not self.__starting: return
+
+		for task in self.__tasks:
+			task.cancel()
+
+		for plugin in self.__plugins:
+			plugin.stop()
+
+		self.__mqtt_sub_callback.deinit()
+		self.__publish_queue.deinit()
+
+		try:
+			self.__mqtt_client.deinit()
+		except:
+			pass
+
+		self.__starting = False
+
+	async def __msg_task(self):
+		while self.__starting:
+			try:
+				self.__mqtt_client.check_msg()
+			except OSError as ose:
+				await self.__mqtt_client.recover(ose)
+			except Exception as e:
+				Utilities.log(self.__msg_task, str(e))
+
+			await asyncio.sleep_ms(HardwareConfig.MSG_CHECK_PERIOD)
+
+	def __reconnect_cb(self):
+		# 启动时的连接由 start() 发布上线消息
+		if not self.__starting: return
+
+		# 重新连接时等待确认窗口中可能还有重发的消息，上线消息使用 QoS 0，不占用窗口，
+		# 连接刚刚建立，丢失的可能性很小，再次断开时还会重新发布
+		self.__mqtt_client.publish(HardwareConfig.MY_TOPIC, self.__online_data, retain=True)
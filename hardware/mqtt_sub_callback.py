@@ -4,86 +4,149 @@ Copyright © 2021 Walkline Wang (https://walkline.wang)
 https://gitee.com/walkline/remote-wol-micropython
 """
 import json
-from utils.wol import wake_on_lan
+import uerrno
+from utils.latency_stats import LatencyStats
+from .command_router import CommandRouter
 from utils.utilities import Utilities
-from utils.wifihandler import WifiHandler
+from utils.identity import Identity
 from machine import RTC
-from utime import localtime
+from utime import localtime, ticks_us, ticks_diff
 import gc
 
 
 class MQTTSubCallback(object):
-	def __init__(self, client, topic):
+	"""
+	- MQTT 消息处理
+
+	只注册设备管理相关的命令，其它功能的命令由插件调用 register() 注册
+	"""
+	# 各阶段耗时均从开始读取消息算起，parse 和 publish 统计所有命令，send 统计 wake_up_pc 的每次发送
+	STAGES = ('parse', 'send', 'publish')
+
+	def __init__(self, client, topic, publish_queue):
 		self._client = client
 		self._topic = topic
+		self._publish_queue = publish_queue
+		self._router = CommandRouter(topic, Identity.mac_address())
+		self._latency_stats = LatencyStats(self.STAGES)
+		self._datetime_cbs = []
+
+		self.register('device_remove', self.__device_remove)
+		self.register('sync_datetime', self.__sync_datetime)
+		self.register('device_reboot', self.__device_reboot)
+		self.register('report_error_log', self.__report_error_log)
+		self.register('report_stats', self.__report_stats)
+
+	def deinit(self):
+		self._datetime_cbs = []
 
 	def get_callback(self):
 		return self.__sub_cb
 
+	def register(self, command, handler, device_only=True):
+		"""
+		注册命令处理函数，详情参考 CommandRouter.register()
+		"""
+		self._router.register(command, handler, device_only)
+
+	@property
+	def mac_address(self):
+		return self._router.mac_address
+
+	def add_datetime_callback(self, f):
+		"""
+		sync_datetime 命令修改时间之后调用 f()
+		"""
+		self._datetime_cbs.append(f)
+
+	def publish_result(self, result):
+		"""
+		发布不是由命令直接返回的结果，例如定时唤醒和唤醒验证的结果，发送失败时由离线队列重发
+		"""
+		try:
+			self._publish_queue.publish(self._topic, json.dumps(result), qos=1)
+		except OSError as ose:
+			print("result queued:", ose)
+
+		gc.collect()
+
+	def record_latency(self, stage, end_us):
+		"""
+		记录从开始读取当前消息到 end_us 的耗时，stage 为 STAGES 中的阶段名称
+		"""
+		self._latency_stats.record(stage, ticks_diff(end_us, self._client.recv_us))
+
 	def __sub_cb(self, topic, msg):
-		if topic != self._topic:
+		if topic != self._router.topic or not self._router.accepts(msg):
 			return
 
 		print("msg: {}".format(msg))
 
 		try:
-			json_obj = json.loads(str(msg, "utf-8"))
-			command = json_obj['command']
-			general_result = {
-				'command': command + '_result',
-				'mac_address': json_obj['mac_address'],
-				'result': 'success'
-			}
-
-			if command == "wake_up_pc":
-				for count in range(3):
-					wake_on_lan(json_obj['mac_address'])
-
-				general_result['title'] = json_obj['title']
-				general_result['mac_address'] = WifiHandler.get_mac_address()
-				self._client.publish(topic, json.dumps(general_result))
-			elif command == 'device_remove':
-				if json_obj['mac_address'] != WifiHandler.get_mac_address():
-					return
-
-				general_result['title'] = json_obj['title']
-				self._client.publish(topic, json.dumps(general_result))
-				
-				Utilities.del_settings_file()
-				Utilities.hard_reset()
-			elif command == 'sync_datetime':
-				if json_obj['mac_address'] != WifiHandler.get_mac_address():
-					return
-
-				datetime = json_obj['datetime']
-				RTC().datetime((
-					datetime['year'],
-					datetime['month'],
-					datetime['day'],
-					datetime['weekday'], # 0~6
-					datetime['hour'],
-					datetime['minute'],
-					datetime['second'],
-					datetime['millisecond']
-				))
-
-				self._client.publish(topic, json.dumps(general_result))
-
-				print("datetime: %02d-%02d-%02d %02d:%02d:%02d" % ((localtime()[:-2])))
-			elif command == 'device_reboot':
-				if json_obj['mac_address'] != WifiHandler.get_mac_address():
-					return
-
-				Utilities.hard_reset()
-			elif command == 'report_error_log':
-				if json_obj['mac_address'] != WifiHandler.get_mac_address():
-					return
-
-				general_result['logs'] = Utilities.read_logs()
-				self._client.publish(topic, json.dumps(general_result))
+			result = self._router.dispatch(topic, msg)
+
+			self.record_latency('parse', self._router.parsed_us)
+
+			if result is not None:
+				self._publish_queue.publish(topic, json.dumps(result), qos=1)
+				self.record_latency('publish', ticks_us())
 		except ValueError:
 			pass
 		except KeyError as ke:
 			print("KeyError:", ke)
+		except OSError as ose:
+			# 等待确认窗口已满时消息已经存入发布队列，不需要恢复连接
+			if ose.args[0] != uerrno.EAGAIN:
+				raise
 
 		gc.collect()
+
+	def __device_remove(self, json_obj, general_result):
+		general_result['title'] = json_obj['title']
+		self._publish_queue.publish(self._topic, json.dumps(general_result))
+
+		Utilities.del_settings_file()
+		Utilities.hard_reset()
+
+	def __sync_datetime(self, json_obj, general_result):
+		datetime = json_obj['datetime']
+		RTC().datetime((
+			datetime['year'],
+			datetime['month'],
+			datetime['day'],
+			datetime['weekday'], # 0~6
+			datetime['hour'],
+			datetime['minute'],
+			datetime['second'],
+			datetime['millisecond']
+		))
+
+		for datetime_cb in self._datetime_cbs:
+			datetime_cb()
+
+		print("datetime: %02d-%02d-%02d %02d:%02d:%02d" % ((localtime()[:-2])))
+
+		return general_result
+
+	def __device_reboot(self, json_obj, general_result):
+		Utilities.hard_reset()
+
+	def __report_error_log(self, json_obj, general_result):
+		general_result['logs'] = Utilities.read_logs()
+		general_result['recovery'] = self._client.recovery.counters
+		general_result['queue'] = self._publish_queue.stats()
+		general_result['router'] = self._router.stats()
+		general_result['delivery'] = self._client.delivery_stats()
+		general_result['brokers'] = self._client.broker_pool.stats()
+		general_result['link'] = self._client.link_monitor.stats()
+
+		return general_result
+
+	def __report_stats(self, json_obj, general_result):
+		general_result['unit'] = 'us'
+		general_result['stats'] = self._latency_stats.report()
+
+		if json_obj.get('reset'):
+			self._latency_stats.reset()
+
+		return general_result
@@ -0,0 +1,28 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+class DevicePlugin(object):
+	"""
+	- 设备功能插件
+
+	每个插件模块定义一个名为 Plugin 的类，由 Selector 根据 Config.PLUGINS 加载：
+	    setup(): 在设备 setup() 时调用，用于注册命令、创建对象
+	    start(): 在设备连接服务器之后调用，用于创建 uasyncio 任务
+	    stop(): 在设备 stop() 时调用，用于取消任务、释放资源
+
+	参数：
+	    device: Device 对象
+	"""
+	def __init__(self, device):
+		self._device = device
+
+	def setup(self):
+		pass
+
+	def start(self):
+		pass
+
+	def stop(self):
+		pass
@@ -0,0 +1,187 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import json
+import uasyncio as asyncio
+from hardware.plugins import DevicePlugin
+from hardware.device import HardwareConfig
+from services.data_batch import DataBatch
+from services.sample_history import SampleHistory
+from services.report_policy import ReportPolicy
+from drivers.ds18b20 import DS18B20
+from config import Config
+from settings import Settings
+from utils.utilities import Utilities
+
+
+class Plugin(DevicePlugin):
+	"""
+	- 温度上报插件
+
+	每隔 Config.DATA_TIMER_PERIOD 读取一次总线上所有 DS18B20 的温度，
+	每个传感器按照各自的 ReportPolicy 决定是否上报，数据单独发布到 DATA_TOPIC，使用 rom 字段区分，
+	Config.DATA_BATCH_SIZE 大于 1 时每个传感器分别批量发布，越过报警阈值时立即发布已缓存的数据，
+	每次采样之后检查所有传感器的缓存，不论本次是否有数据需要上报，缓存时间最多超过 DATA_BATCH_PERIOD 一个采样周期
+
+	等待温度转换期间让出事件循环，不影响命令处理
+
+	每个传感器最近 Config.HISTORY_SIZE 个数据保存在 SampleHistory 中
+
+	提供命令：
+	    scan_probes: 重新扫描总线并返回传感器列表
+	    query_history: 返回指定时间内降采样的历史数据、各窗口的统计结果和上报计数，
+	                   参数 window（s）、points、rom 均为可选
+	"""
+	DATA_TOPIC = '{}/data'.format(HardwareConfig.USERNAME).encode()
+
+	def __init__(self, device):
+		super().__init__(device)
+
+		self.__ds18b20 = None
+		self.__data_batches = {} # rom_id: DataBatch
+		self.__histories = {} # rom_id: SampleHistory
+		self.__policies = {} # rom_id: ReportPolicy
+		self.__task = None
+
+	def setup(self):
+		self.__ds18b20 = DS18B20(Config.DS18B20_DATALINE, Config.DS18B20_RESOLUTION)
+
+		self._device.sub_callback.register('scan_probes', self.__scan_probes)
+		self._device.sub_callback.register('query_history', self.__query_history)
+
+	def start(self):
+		self.__task = asyncio.create_task(self.__data_task())
+
+	def stop(self):
+		if self.__task is not None:
+			self.__task.cancel()
+			self.__task = None
+
+		self.__ds18b20.deinit()
+
+	async def get_temperatures(self):
+		"""
+		返回 {ROM 编号: 温度}
+		"""
+		await asyncio.sleep_ms(self.__ds18b20.start_conversion())
+
+		return self.__ds18b20.collect()
+
+	def __scan_probes(self, json_obj, general_result):
+		general_result['probes'] = self.__ds18b20.scan()
+
+		return general_result
+
+	def __query_history(self, json_obj, general_result):
+		window = int(json_obj.get('window', Config.HISTORY_WINDOWS[-1]))
+		points = int(json_obj.get('points', 60))
+		rom_ids = [json_obj['rom']] if 'rom' in json_obj else list(self.__histories)
+
+		general_result['history'] = {}
+		general_result['stats'] = {}
+		general_result['reports'] = {}
+
+		for rom_id in rom_ids:
+			history = self.__histories.get(rom_id)
+
+			if history is not None:
+				general_result['history'][rom_id] = history.history(window, points)
+				general_result['stats'][rom_id] = history.stats()
+				general_result['reports'][rom_id] = self.__policies[rom_id].counters
+
+		return general_result
+
+	def __add_history(self, rom_id, value):
+		history = self.__histories.get(rom_id)
+
+		if history is None:
+			history = self.__histories[rom_id] = SampleHistory(Config.HISTORY_SIZE, Config.HISTORY_WINDOWS)
+
+		history.append(value)
+
+	def __check_policy(self, rom_id, value):
+		"""
+		返回 (上报原因, 报警状态)，不需要上报时原因为 None
+		"""
+		policy = self.__policies.get(rom_id)
+
+		if policy is None:
+			policy = self.__policies[rom_id] = ReportPolicy(
+				Config.REPORT_DEADBAND,
+				Config.REPORT_MIN_INTERVAL,
+				Config.REPORT_MAX_INTERVAL,
+				Config.ALARM_LOW,
+				Config.ALARM_HIGH
+			)
+
+		return policy.check(value), policy.alarm
+
+	def __publish_data(self, rom_id, value, reason, alarm):
+		if Config.DATA_BATCH_SIZE <= 1:
+			data = {
+				'key': Settings.MQTT_DATA_POINT[0],
+				'rom': rom_id,
+				'vlue': value,
+				'reason': reason
+			}
+
+			if alarm is not None:
+				data['alarm'] = alarm
+
+			self._device.publish_queue.publish(self.DATA_TOPIC, json.dumps(data))
+		else:
+			data_batch = self.__data_batches.get(rom_id)
+
+			if data_batch is None:
+				data_batch = self.__data_batches[rom_id] = DataBatch(Config.DATA_BATCH_SIZE, Config.DATA_BATCH_PERIOD)
+
+			data_batch.append(value)
+
+			if reason == ReportPolicy.REASON_ALARM:
+				self.__flush_batch(rom_id, data_batch)
+
+	def __flush_batches(self):
+		"""
+		发布所有已经满足条件的缓存，包括本次没有数据需要上报或者读取失败的传感器
+		"""
+		for rom_id, data_batch in self.__data_batches.items():
+			if data_batch.ready:
+				self.__flush_batch(rom_id, data_batch)
+
+	def __flush_batch(self, rom_id, data_batch):
+		data = data_batch.flush(Settings.MQTT_DATA_POINT[0])
+		data['rom'] = rom_id
+		alarm = self.__policies[rom_id].alarm
+
+		if alarm is not None:
+			data['alarm'] = alarm
+
+		self._device.publish_queue.publish(self.DATA_TOPIC, json.dumps(data))
+
+	async def __data_task(self):
+		while True:
+			await asyncio.sleep_ms(Config.DATA_TIMER_PERIOD)
+
+			temperatures = await self.get_temperatures()
+
+			if not temperatures:
+				print("no temperature probe found")
+
+			try:
+				for rom_id, value in temperatures.items():
+					print("current temperature: {} ℃ ({})".format(value, rom_id))
+
+					self.__add_history(rom_id, value)
+
+					reason, alarm = self.__check_policy(rom_id, value)
+
+					if reason is not None:
+						self.__publish_data(rom_id, value, reason, alarm)
+
+				self.__flush_batches()
+			except OSError as ose:
+				await self._device.mqtt_client.recover(ose)
+			except Exception as e:
+				Utilities.log(self.__data_task, str(e))
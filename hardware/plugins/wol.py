@@ -0,0 +1,186 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import uasyncio as asyncio
+from hardware.plugins import DevicePlugin
+from hardware.wake_scheduler import WakeScheduler, WakeSchedulerException
+from utils.wol import WOLSender, WOLTarget
+from utils.wake_verifier import WakeVerifier, WakeVerifierException
+
+
+class Plugin(DevicePlugin):
+	"""
+	- 网络唤醒插件
+
+	提供 wake_up_pc、schedule_wake、cancel_wake、list_wakes 命令
+	"""
+	def __init__(self, device):
+		super().__init__(device)
+
+		self.__wol_sender = None
+		self.__wake_verifier = None
+		self.__wake_scheduler = None
+
+	def setup(self):
+		sub_callback = self._device.sub_callback
+
+		self.__wol_sender = WOLSender()
+		self.__wake_verifier = WakeVerifier(self.__verify_result_cb)
+		self.__wake_scheduler = WakeScheduler(self.__scheduled_wake_cb)
+
+		# wake_up_pc 消息中的 mac_address 是目标电脑的 MAC 地址
+		sub_callback.register('wake_up_pc', self.__wake_up_pc, device_only=False)
+		sub_callback.register('schedule_wake', self.__schedule_wake)
+		sub_callback.register('cancel_wake', self.__cancel_wake)
+		sub_callback.register('list_wakes', self.__list_wakes)
+		sub_callback.add_datetime_callback(self.__wake_scheduler.rearm)
+
+	def stop(self):
+		self.__wol_sender.deinit()
+		self.__wake_verifier.deinit()
+		self.__wake_scheduler.deinit()
+
+	def __wake_up_pc(self, json_obj, general_result):
+		# targets 为可选的目标列表，用于一次唤醒多台电脑，元素可以是 MAC 地址字符串，
+		# 或者包含 mac_address、host、port、password 字段的字典，
+		# 消息顶层的 host、port、password 字段作为各个目标的默认值
+		general_result['title'] = json_obj['title']
+		general_result['mac_address'] = self._device.sub_callback.mac_address
+
+		try:
+			targets = [WOLTarget.parse(target, json_obj) for target in json_obj.get('targets') or [json_obj['mac_address']]]
+			repeats, spacing = WOLSender.check_rounds(json_obj.get('repeats', 3), json_obj.get('spacing', 0))
+		except ValueError as ve:
+			general_result['result'] = 'failed'
+			general_result['error'] = str(ve)
+
+			return general_result
+
+		if repeats > 1 and spacing > 0:
+			# 需要间隔发送时在任务中进行，全部发送完成之后再发布结果
+			asyncio.create_task(self.__wake_up_pc_async(targets, repeats, spacing, json_obj, general_result))
+			return None
+
+		self.__set_timings(self.__wol_sender.wake_many(targets, repeats, self.__sent_cb), general_result)
+		self.__check_verify(json_obj, targets, general_result)
+
+		return general_result
+
+	async def __wake_up_pc_async(self, targets, repeats, spacing, json_obj, general_result):
+		# 发送时正在处理的已经不是这条消息，不统计 send 阶段的耗时
+		self.__set_timings(await self.__wol_sender.wake_many_async(targets, repeats, spacing), general_result)
+		self.__check_verify(json_obj, targets, general_result)
+
+		self._device.sub_callback.publish_result(general_result)
+
+	def __set_timings(self, timings, general_result):
+		"""
+		任何一个目标发送失败时，结果为 failed，error 为第一个错误信息，每个目标的错误信息在 timings 中
+		"""
+		general_result['timings'] = timings
+
+		for _, _, error in timings:
+			if error is not None:
+				general_result['result'] = 'failed'
+				general_result['error'] = error
+				break
+
+	def __check_verify(self, json_obj, targets, general_result):
+		verify = json_obj.get('verify')
+
+		if verify:
+			self.__add_verify(verify, json_obj, targets[0], general_result)
+
+	def __schedule_wake(self, json_obj, general_result):
+		try:
+			# target 与 wake_up_pc 命令的 targets 元素格式相同
+			general_result['id'] = self.__wake_scheduler.schedule(
+				WOLTarget.parse(json_obj['target']),
+				WakeScheduler.parse_time(json_obj),
+				int(json_obj.get('interval', 0))
+			)
+		except (Exception, WakeSchedulerException) as e:
+			general_result['result'] = 'failed'
+			general_result['error'] = str(e)
+
+		return general_result
+
+	def __cancel_wake(self, json_obj, general_result):
+		general_result['id'] = json_obj['id']
+
+		if not self.__wake_scheduler.cancel(json_obj['id']):
+			general_result['result'] = 'failed'
+
+		return general_result
+
+	def __list_wakes(self, json_obj, general_result):
+		general_result['total'] = len(self.__wake_scheduler)
+		general_result['wakes'] = self.__wake_scheduler.list(
+			json_obj.get('offset', 0),
+			json_obj.get('limit', 50)
+		)
+
+		return general_result
+
+	def __sent_cb(self, end_us):
+		self._device.sub_callback.record_latency('send', end_us)
+
+	def __add_verify(self, verify, json_obj, target, general_result):
+		"""
+		添加唤醒验证任务，verify 形如 {"host": "", "port": 445, "timeout": 180}，
+		未指定 host 时使用目标的单播地址
+		"""
+		if not isinstance(verify, dict):
+			verify = {}
+
+		host = verify.get('host')
+
+		if host is None and target.host not in (WOLTarget.LIMITED_BROADCAST, WOLTarget.DIRECTED_BROADCAST):
+			host = target.host
+
+		if host is None:
+			general_result['verify'] = 'no host'
+			return
+
+		context = {
+			'title': json_obj['title'],
+			'target': target.mac_address,
+			'host': host
+		}
+
+		try:
+			self.__wake_verifier.add(
+				host,
+				verify.get('port', WakeVerifier.DEFAULT_PORT),
+				verify.get('timeout', WakeVerifier.DEFAULT_TIMEOUT),
+				context
+			)
+
+			general_result['verify'] = 'pending'
+		except (Exception, WakeVerifierException) as e:
+			general_result['verify'] = str(e)
+
+	def __scheduled_wake_cb(self, job_id, target):
+		result = {
+			'command': 'scheduled_wake_result',
+			'mac_address': self._device.sub_callback.mac_address,
+			'result': 'success',
+			'id': job_id
+		}
+
+		self.__set_timings(self.__wol_sender.wake_many([target]), result)
+		self._device.sub_callback.publish_result(result)
+
+	def __verify_result_cb(self, context, online, latency):
+		result = {
+			'command': 'wake_up_pc_result',
+			'mac_address': self._device.sub_callback.mac_address,
+			'result': 'online' if online else 'timeout',
+			'latency': latency
+		}
+
+		result.update(context)
+
+		self._device.sub_callback.publish_result(result)
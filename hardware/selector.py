@@ -9,21 +9,40 @@ class SelectorException(BaseException):
 
 class Selector(object):
 	"""
-	硬件版本选择器
+	硬件版本选择器，根据 Config.PLUGINS 创建设备并加载该版本使用的插件，
+	没有列出的插件不会被导入
 	"""
 	@staticmethod
 	def select(mod_name=None):
 		assert mod_name is not None and isinstance(mod_name, str), SelectorException("mod_name must be a str")
 
-		# print("loading hardware:", mod_name)
+		from config import Config
 
 		try:
-			mod_path = "{}{}".format(Selector.__module__.split("selector")[0], mod_name)
-			module = getattr(__import__(mod_path), mod_name)
-			classs = getattr(module, mod_name)
-
-			# assert isinstance(classs, type), SelectorException("class type get wrong")
-			
-			return classs()
-		except:
-			raise SelectorException("cannot load hardware module: {}".format(mod_name))
+			plugin_names = Config.PLUGINS[mod_name]
+		except KeyError:
+			raise SelectorException("unknown hardware version: {}".format(mod_name))
+
+		from .device import Device
+
+		device = Device()
+
+		for plugin_name in plugin_names:
+			device.add_plugin(Selector.load_plugin(plugin_name)(device))
+
+		return device
+
+	@staticmethod
+	def load_plugin(plugin_name):
+		"""
+		导入 hardware/plugins 目录中的插件模块，返回插件类
+		"""
+		# print("loading plugin:", plugin_name)
+
+		try:
+			package = "{}plugins".format(Selector.__module__.split("selector")[0])
+			module = getattr(getattr(__import__("{}.{}".format(package, plugin_name)), "plugins"), plugin_name)
+
+			return getattr(module, "Plugin")
+		except Exception as e:
+			raise SelectorException("cannot load plugin: {} ({}: {})".format(plugin_name, type(e).__name__, e))
@@ -0,0 +1,445 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import os
+import uheapq
+import ustruct
+import uasyncio as asyncio
+from array import array
+from ubinascii import hexlify, unhexlify
+from utime import time, mktime
+from utils.wol import WOLTarget
+
+
+class WakeSchedulerException(BaseException):
+	pass
+
+
+class WakeScheduler(object):
+	"""
+	- 定时唤醒
+
+	所有任务保存在以下次触发时间排序的最小堆中，只使用一个 uasyncio 任务，
+	每次都按照最早的触发时间等待，任务变化时重新计算等待时间，插入和弹出的复杂度为 O(log n)
+
+	任务以固定长度的二进制记录保存在 flash 中，新任务直接追加到文件末尾，删除任务时才重写文件，
+	周期任务只保存首次触发时间和周期，下次触发时间由当前时间推算，所以任务触发时不需要重写文件
+
+	内存中的记录按槽位保存在同一个 bytearray 中，槽位不够时每次增加 GROW_SLOTS 个，空闲槽位保存在列表中，
+	job_id 由槽位和该槽位的使用次数生成，可以直接计算出槽位，添加和取消任务都不需要遍历，
+	堆中保存 (next_time, slot)，next_times 中保存每个槽位当前的触发时间，用于识别已取消或者已过期的堆记录，
+	每个任务约占用 29 字节记录、4 字节触发时间和一个堆元组，MAX_JOBS 个任务约 27KB
+
+	时间使用 RTC 时间（秒），可以通过 sync_datetime 命令校准，上电后校准之前 RTC 时间不正确，
+	校准后调用 rearm() 按照新的时间重新计算所有任务的下次触发时间，并删除已经错过的单次任务
+
+	参数：
+	    wake_cb: 任务触发时的回调函数，形如 wake_cb(job_id, target)
+	"""
+	JOBS_FILE = "wakes.bin"
+	MAX_JOBS = 512
+	GROW_SLOTS = 32
+	MAX_WAIT_PERIOD = 60 * 60 # 最长等待时间（秒），防止校准时间后错过任务
+	MISSED_GRACE = 5 * 60 # 重启后，错过时间不超过该值（秒）的单次任务仍然会被执行
+
+	# job_id, first_time, interval, mac, password, ip, port, flags
+	__RECORD_FORMAT = "<HII6s6s4sHB"
+	__RECORD_SIZE = ustruct.calcsize(__RECORD_FORMAT)
+
+	__FLAG_DIRECTED = 0x01
+	__FLAG_IP = 0x02
+	__FLAG_PASSWORD = 0x04
+	__FLAG_USED = 0x80 # 槽位正在使用
+
+	__FLAGS_OFFSET = __RECORD_SIZE - 1
+	__GENERATIONS = 0xffff // MAX_JOBS # 每个槽位可以生成的 job_id 数量
+
+	def __init__(self, wake_cb):
+		assert wake_cb is not None, WakeSchedulerException("wake_cb must be specified")
+
+		self.__wake_cb = wake_cb
+		self.__records = bytearray()
+		self.__next_times = array('I')
+		self.__free_slots = []
+		self.__count = 0
+		self.__heap = [] # [(next_time, slot), ...]
+		self.__rearm_event = asyncio.Event()
+
+		self.__load()
+		self.__task = asyncio.create_task(self.__scheduler_task())
+
+	def deinit(self):
+		self.__task.cancel()
+
+	def __len__(self):
+		return self.__count
+
+	def schedule(self, target, first_time, interval=0):
+		"""
+		- 添加定时唤醒任务
+
+		参数：
+		    target: WOLTarget 对象
+		    first_time: 首次触发时间（RTC 秒数）
+		    interval: 重复周期（秒），0 表示只执行一次
+
+		返回值：
+		    任务 ID
+		"""
+		if self.__count >= self.MAX_JOBS:
+			raise WakeSchedulerException("too many jobs")
+
+		if interval < 0:
+			raise ValueError("interval must be >= 0")
+
+		if interval == 0 and first_time <= time():
+			raise ValueError("time already passed")
+
+		slot = self.__allocate_slot()
+		job_id = self.__new_job_id(slot)
+		record = self.__pack(job_id, first_time, interval, target)
+
+		self.__store(slot, record)
+		self.__push(slot, self.__next_time(first_time, interval, time()))
+		self.__append(record)
+		self.__rearm_event.set()
+
+		return job_id
+
+	def cancel(self, job_id):
+		"""
+		取消任务，堆中的记录在弹出时丢弃
+		"""
+		slot = self.__slot(job_id)
+
+		if slot < 0:
+			return False
+
+		self.__free(slot)
+
+		# 无效记录过多时重建堆
+		if len(self.__heap) > 2 * self.__count + 16:
+			self.__heap = [entry for entry in self.__heap if self.__is_valid(entry)]
+			uheapq.heapify(self.__heap)
+
+		self.__save()
+		self.__rearm_event.set()
+
+		return True
+
+	def list(self, offset=0, limit=50):
+		"""
+		按照下次触发时间顺序列出任务
+		"""
+		entries = sorted([entry for entry in self.__heap if self.__is_valid(entry)])
+		result = []
+
+		for next_time, slot in entries[offset:offset + limit]:
+			job_id, first_time, interval, target = self.__unpack(self.__records, slot * self.__RECORD_SIZE)
+			result.append({
+				'id': job_id,
+				'next_time': next_time,
+				'interval': interval,
+				'mac_address': target.mac_address,
+				'host': target.host,
+				'port': target.port,
+			})
+
+		return result
+
+	def rearm(self):
+		"""
+		RTC 时间改变后调用，按照新的时间重新计算所有任务的下次触发时间，删除已经错过的单次任务
+		"""
+		if self.__rebuild(time()):
+			self.__save()
+
+		self.__rearm_event.set()
+
+	async def __scheduler_task(self):
+		while True:
+			while self.__heap and not self.__is_valid(self.__heap[0]):
+				uheapq.heappop(self.__heap)
+
+			self.__rearm_event.clear()
+
+			try:
+				if self.__heap:
+					delay = min(max(self.__heap[0][0] - time(), 0), self.MAX_WAIT_PERIOD)
+
+					await asyncio.wait_for_ms(self.__rearm_event.wait(), delay * 1000 + 1)
+				else:
+					await self.__rearm_event.wait()
+			except asyncio.TimeoutError:
+				self.__fire_due_jobs()
+
+	def __fire_due_jobs(self):
+		now = time()
+		changed = False
+
+		while self.__heap and self.__heap[0][0] <= now:
+			entry = uheapq.heappop(self.__heap)
+
+			if not self.__is_valid(entry):
+				continue
+
+			slot = entry[1]
+			job_id, first_time, interval, target = self.__unpack(self.__records, slot * self.__RECORD_SIZE)
+
+			try:
+				self.__wake_cb(job_id, target)
+			except Exception as e:
+				print("WakeScheduler wake_cb error:", e)
+
+			if interval > 0:
+				self.__push(slot, self.__next_time(first_time, interval, now + 1))
+			else:
+				self.__free(slot)
+				changed = True
+
+		if changed:
+			self.__save()
+
+	def __push(self, slot, next_time):
+		self.__next_times[slot] = next_time
+		uheapq.heappush(self.__heap, (next_time, slot))
+
+	def __is_valid(self, entry):
+		"""
+		判断堆中的记录是否对应一个未取消的任务，并且是该任务当前的触发时间
+		"""
+		next_time, slot = entry
+
+		return self.__used(slot) and self.__next_times[slot] == next_time
+
+	def __used(self, slot):
+		return self.__records[slot * self.__RECORD_SIZE + self.__FLAGS_OFFSET] & self.__FLAG_USED != 0
+
+	def __job_id(self, slot):
+		return ustruct.unpack_from("<H", self.__records, slot * self.__RECORD_SIZE)[0]
+
+	def __slot(self, job_id):
+		"""
+		返回任务所在的槽位，不存在时返回 -1
+		"""
+		if not isinstance(job_id, int) or not 0 < job_id <= 0xffff:
+			return -1
+
+		slot = (job_id - 1) % self.MAX_JOBS
+
+		if slot < len(self.__next_times) and self.__used(slot) and self.__job_id(slot) == job_id:
+			return slot
+
+		return -1
+
+	def __new_job_id(self, slot):
+		"""
+		job_id = 使用次数 * MAX_JOBS + slot + 1，空闲槽位中保留上一个 job_id，避免短时间内重复使用
+		"""
+		last_id = self.__job_id(slot)
+		generation = 0 if last_id == 0 else ((last_id - 1) // self.MAX_JOBS + 1) % self.__GENERATIONS
+
+		return generation * self.MAX_JOBS + slot + 1
+
+	def __grow(self):
+		start = len(self.__next_times)
+		count = min(self.GROW_SLOTS, self.MAX_JOBS - start)
+
+		self.__records.extend(bytes(count * self.__RECORD_SIZE))
+		self.__next_times.extend(array('I', [0] * count))
+		self.__free_slots.extend(range(start + count - 1, start - 1, -1))
+
+	def __allocate_slot(self):
+		if not self.__free_slots:
+			self.__grow()
+
+		return self.__free_slots.pop()
+
+	def __store(self, slot, record):
+		offset = slot * self.__RECORD_SIZE
+		self.__records[offset:offset + self.__RECORD_SIZE] = record
+		self.__records[offset + self.__FLAGS_OFFSET] |= self.__FLAG_USED
+		self.__count += 1
+
+	def __free(self, slot):
+		"""
+		释放槽位，保留 job_id 用于生成下一个 job_id
+		"""
+		self.__records[slot * self.__RECORD_SIZE + self.__FLAGS_OFFSET] &= ~self.__FLAG_USED & 0xff
+		self.__free_slots.append(slot)
+		self.__count -= 1
+
+	def __rebuild(self, now):
+		"""
+		按照 now 重新计算所有任务的下次触发时间并重建堆，错过超过 MISSED_GRACE 的单次任务被删除，
+		有任务被删除时返回 True
+		"""
+		changed = False
+		self.__heap = []
+
+		for slot in range(len(self.__next_times)):
+			if not self.__used(slot):
+				continue
+
+			job_id, first_time, interval, _ = self.__unpack(self.__records, slot * self.__RECORD_SIZE, False)
+
+			if interval == 0 and first_time < now - self.MISSED_GRACE:
+				self.__free(slot)
+				changed = True
+				continue
+
+			self.__next_times[slot] = self.__next_time(first_time, interval, now)
+			self.__heap.append((self.__next_times[slot], slot))
+
+		uheapq.heapify(self.__heap)
+
+		return changed
+
+	@staticmethod
+	def __next_time(first_time, interval, now):
+		"""
+		计算不早于 now 的下次触发时间
+		"""
+		if interval == 0 or first_time >= now:
+			return first_time
+
+		return first_time + ((now - first_time + interval - 1) // interval) * interval
+
+	def __pack(self, job_id, first_time, interval, target):
+		flags = 0
+		ip = b'\x00' * 4
+		password = b'\x00' * 6
+
+		if target.host == WOLTarget.DIRECTED_BROADCAST:
+			flags |= self.__FLAG_DIRECTED
+		elif target.host != WOLTarget.LIMITED_BROADCAST:
+			flags |= self.__FLAG_IP
+			ip = bytes([int(part) for part in target.host.split('.')])
+
+		if target.password is not None:
+			flags |= self.__FLAG_PASSWORD
+			password = unhexlify(target.password)
+
+		return ustruct.pack(
+			self.__RECORD_FORMAT,
+			job_id,
+			first_time,
+			interval,
+			unhexlify(target.mac_address),
+			password,
+			ip,
+			target.port,
+			flags
+		)
+
+	def __unpack(self, buffer, offset=0, with_target=True):
+		job_id, first_time, interval, mac, password, ip, port, flags = ustruct.unpack_from(self.__RECORD_FORMAT, buffer, offset)
+
+		if not with_target:
+			return job_id, first_time, interval, None
+
+		if flags & self.__FLAG_DIRECTED:
+			host = WOLTarget.DIRECTED_BROADCAST
+		elif flags & self.__FLAG_IP:
+			host = '.'.join([str(part) for part in ip])
+		else:
+			host = WOLTarget.LIMITED_BROADCAST
+
+		target = WOLTarget(
+			hexlify(mac).decode(),
+			host,
+			port,
+			hexlify(password).decode() if flags & self.__FLAG_PASSWORD else None
+		)
+
+		return job_id, first_time, interval, target
+
+	def __append(self, record):
+		try:
+			with open(self.JOBS_FILE, "ab") as file:
+				file.write(record)
+		except OSError as ose:
+			print("save wake job failed:", ose)
+
+	def __save(self):
+		temp_file = self.JOBS_FILE + ".tmp"
+
+		try:
+			view = memoryview(self.__records)
+
+			with open(temp_file, "wb") as file:
+				for slot in range(len(self.__next_times)):
+					if self.__used(slot):
+						offset = slot * self.__RECORD_SIZE
+						file.write(view[offset:offset + self.__RECORD_SIZE])
+
+			os.rename(temp_file, self.JOBS_FILE)
+		except OSError as ose:
+			print("save wake jobs failed:", ose)
+
+	def __load(self):
+		try:
+			file = open(self.JOBS_FILE, "rb")
+		except OSError:
+			return
+
+		conflicts = []
+
+		with file:
+			while True:
+				record = file.read(self.__RECORD_SIZE)
+
+				if len(record) < self.__RECORD_SIZE:
+					break
+
+				slot = (ustruct.unpack_from("<H", record)[0] - 1) % self.MAX_JOBS
+
+				while slot >= len(self.__next_times):
+					self.__grow()
+
+				if self.__used(slot):
+					# 槽位已经被占用，说明文件不是由当前的 MAX_JOBS 生成的，之后重新分配 job_id
+					conflicts.append(bytearray(record))
+				else:
+					self.__store(slot, record)
+
+		self.__free_slots = [slot for slot in range(len(self.__next_times) - 1, -1, -1) if not self.__used(slot)]
+
+		for record in conflicts:
+			if self.__count >= self.MAX_JOBS:
+				break
+
+			slot = self.__allocate_slot()
+			ustruct.pack_into("<H", record, 0, self.__new_job_id(slot))
+			self.__store(slot, record)
+
+		# 上电后 RTC 时间可能还没有校准，校准后 rearm() 会重新计算
+		if self.__rebuild(time()) or conflicts:
+			self.__save()
+
+	@staticmethod
+	def parse_time(json_obj):
+		"""
+		- 从 MQTT 消息中解析首次触发时间
+
+		支持两种方式：
+		    datetime: 与 sync_datetime 命令相同格式的日期时间字典
+		    delay: 从现在开始的延迟时间（秒）
+		"""
+		datetime = json_obj.get('datetime')
+
+		if datetime is not None:
+			return mktime((
+				datetime['year'],
+				datetime['month'],
+				datetime['day'],
+				datetime['hour'],
+				datetime['minute'],
+				datetime.get('second', 0),
+				0,
+				0
+			))
+
+		return time() + int(json_obj['delay'])
@@ -3,6 +3,7 @@ The MIT License (MIT)
 Copyright © 2021 Walkline Wang (https://walkline.wang)
 https://gitee.com/walkline/remote-wol-micropython
 """
+from utils.boot_profiler import BootProfiler
 from utils.utilities import Utilities
 from utils.wifihandler import WifiHandler
 from drivers.led import Led
@@ -11,15 +12,68 @@ from config import Config
 from utime import sleep
 
 
+BootProfiler.mark(BootProfiler.IMPORTS)
+
 forever_loop = True
 ap_server = None
 led = None
 button = None
 
 
+async def work_mode():
+	"""
+	工作模式，所有功能都作为 uasyncio 任务运行在同一个事件循环中
+	"""
+	global led, button
+
+	import uasyncio as asyncio
+	from hardware import Selector
+
+	led = Led(Config.INDICATE_LED)
+	led_task = asyncio.create_task(led.play(100, 100, 0))
+
+	def __button_click_cb():
+		print("button clicked")
+
+	def __button_press_cb(duration):
+		print("button pressed over {} ms".format(duration))
+		Utilities.del_settings_file()
+		Utilities.hard_reset()
+
+	button = Button(
+		pin = Config.RESET_BUTTON,
+		click_cb = __button_click_cb,
+		press_cb = __button_press_cb,
+		timeout = Config.BUTTON_PRESS_TIMEOUT
+	)
+
+	WifiHandler.set_ap_status(False)
+	await asyncio.sleep(1)
+
+	if WifiHandler.STATION_CONNECTED == await Utilities.connect_to_internet_async():
+		led_task.cancel()
+
+		device = Selector.select(Config.HARDWARE_VERSION)
+		BootProfiler.mark(BootProfiler.SELECT)
+
+		device.setup()
+		await device.start()
+
+		led_task = asyncio.create_task(led.play(1000, 0, 0))
+
+		while forever_loop:
+			await asyncio.sleep_ms(500)
+	else:
+		# 600 秒后无法连接指定的 wifi 则重启
+		Utilities.hard_reset()
+
+
 if __name__ == "__main__":
 	try:
-		if not Utilities.is_settings_file_exist():
+		settings_file_exist = Utilities.is_settings_file_exist()
+		BootProfiler.mark(BootProfiler.SETTINGS)
+
+		if not settings_file_exist:
 			# 进入用户配网模式
 			from services.web_server import WebServer
 
@@ -38,43 +92,9 @@ if __name__ == "__main__":
 				sleep(0.5)
 		else:
 			# 进入工作模式
-			from hardware import Selector
-
-			led = Led(Config.INDICATE_LED)
-			led.blink_fast(0)
-
-			def __button_click_cb():
-				print("button clicked")
-
-			def __button_press_cb(duration):
-				print("button pressed over {} ms".format(duration))
-				Utilities.del_settings_file()
-				Utilities.hard_reset()
-
-			button = Button(
-				pin = Config.RESET_BUTTON,
-				click_cb = __button_click_cb,
-				press_cb = __button_press_cb,
-				timeout = Config.BUTTON_PRESS_TIMEOUT
-			)
-
-			WifiHandler.set_ap_status(False)
-			sleep(1)
-
-			if WifiHandler.STATION_CONNECTED == Utilities.connect_to_internet():
-				led.stop_all()
-
-				device = Selector.select(Config.HARDWARE_VERSION)
-				device.setup()
-				device.start()
-
-				led.customize(1000, 0, 0)
+			import uasyncio as asyncio
 
-				while forever_loop:
-					sleep(0.5)
-			else:
-				# 600 秒后无法连接指定的 wifi 则重启
-				Utilities.hard_reset()
+			asyncio.run(work_mode())
 	except KeyboardInterrupt:
 		forever_loop = False
 
@@ -0,0 +1,178 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import socket
+import uerrno
+import uasyncio as asyncio
+from array import array
+from utime import ticks_ms, ticks_diff
+from utils.tcp_probe import TCPProbe
+
+
+class BrokerPoolException(BaseException):
+	pass
+
+
+class BrokerPool(object):
+	"""
+	- MQTT 服务器列表
+
+	按照优先级保存多个服务器，第一个为主服务器：
+	    1. 连接之前先使用非阻塞的 TCP 连接探测服务器，每个服务器最多等待 PROBE_TIMEOUT 毫秒，
+	       切换到下一个可用服务器的时间不超过 服务器数量 * PROBE_TIMEOUT
+	    2. 最近 HOLDOFF_PERIOD 毫秒内失败过的服务器排在最后尝试
+	    3. 使用备用服务器时，每隔 FAILBACK_PERIOD 毫秒探测一次主服务器，恢复后切回
+
+	只有一个服务器时不进行探测
+
+	参数：
+	    brokers: 服务器列表，形如 [(host, port), ...]
+	"""
+	PROBE_TIMEOUT = 2000
+	PROBE_POLL_PERIOD = 50 # 异步探测检查 socket 状态的间隔时间（ms）
+	HOLDOFF_PERIOD = 60 * 1000
+	FAILBACK_PERIOD = 5 * 60 * 1000
+
+	def __init__(self, brokers):
+		assert len(brokers) > 0, BrokerPoolException("at least one broker must be specified")
+
+		self.__brokers = [(host, int(port)) for host, port in brokers]
+		self.__current = 0
+		self.__switches = 0
+		self.__latency = array('i', [-1] * len(self.__brokers)) # 最近一次连接耗时（ms），-1 为没有连接成功过
+		self.__connects = array('I', [0] * len(self.__brokers))
+		self.__failures = array('I', [0] * len(self.__brokers))
+		self.__failed_ticks = [None] * len(self.__brokers) # 最近一次失败的时间，成功后清空
+
+	def __len__(self):
+		return len(self.__brokers)
+
+	@property
+	def index(self):
+		return self.__current
+
+	@property
+	def current(self):
+		return self.__brokers[self.__current]
+
+	def broker(self, index):
+		return self.__brokers[index]
+
+	def candidates(self):
+		"""
+		按照尝试顺序返回服务器序号，最近失败过的服务器排在最后
+		"""
+		now = ticks_ms()
+		healthy = []
+		held = []
+
+		for index in range(len(self.__brokers)):
+			failed_ticks = self.__failed_ticks[index]
+
+			if failed_ticks is not None and ticks_diff(now, failed_ticks) < self.HOLDOFF_PERIOD:
+				held.append(index)
+			else:
+				healthy.append(index)
+
+		return healthy + held
+
+	async def select(self):
+		"""
+		- 选择服务器
+
+		依次异步探测服务器，返回第一个可用服务器的序号，全部不可用时抛出最后一个 OSError
+		"""
+		if len(self.__brokers) == 1:
+			return 0
+
+		error = OSError(uerrno.ETIMEDOUT)
+
+		for index in self.candidates():
+			try:
+				await self.probe_async(index)
+
+				return index
+			except OSError as ose:
+				error = ose
+
+		raise error
+
+	async def probe_async(self, index):
+		"""
+		异步探测服务器，最多等待 PROBE_TIMEOUT 毫秒，不阻塞其它任务，返回耗时（ms），失败时抛出 OSError
+		"""
+		probe, start = self.__open(index)
+
+		try:
+			while True:
+				if self.__check(index, probe, start):
+					return ticks_diff(ticks_ms(), start)
+
+				await asyncio.sleep_ms(self.PROBE_POLL_PERIOD)
+		finally:
+			probe.close()
+
+	def connected(self, index, latency):
+		"""
+		记录一次成功的 MQTT 连接，latency 为连接耗时（ms）
+		"""
+		if index != self.__current:
+			self.__switches += 1
+			print("mqtt broker switched to {}:{}".format(*self.__brokers[index]))
+
+		self.__current = index
+		self.__latency[index] = latency
+		self.__connects[index] += 1
+		self.__failed_ticks[index] = None
+
+	def failed(self, index):
+		self.__failures[index] += 1
+		self.__failed_ticks[index] = ticks_ms()
+
+	def stats(self):
+		return {
+			'current': self.__current,
+			'switches': self.__switches,
+			'brokers': [
+				{
+					'host': self.__brokers[index][0],
+					'port': self.__brokers[index][1],
+					'latency': self.__latency[index],
+					'connects': self.__connects[index],
+					'failures': self.__failures[index],
+				}
+				for index in range(len(self.__brokers))
+			],
+		}
+
+	def __open(self, index):
+		start = ticks_ms()
+
+		try:
+			probe = TCPProbe(socket.getaddrinfo(*self.__brokers[index])[0][-1])
+		except OSError:
+			self.failed(index)
+			raise
+
+		return probe, start
+
+	def __check(self, index, probe, start):
+		"""
+		检查一次探测结果，连接成功时返回 True，失败或者超时时抛出 OSError
+		"""
+		try:
+			if probe.check():
+				self.__failed_ticks[index] = None
+
+				return True
+		except OSError:
+			self.failed(index)
+			raise
+
+		if ticks_diff(ticks_ms(), start) >= self.PROBE_TIMEOUT:
+			self.failed(index)
+			raise OSError(uerrno.ETIMEDOUT)
+
+		return False
@@ -0,0 +1,81 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+from array import array
+from utime import time, ticks_ms, ticks_diff
+
+
+class DataBatchException(BaseException):
+	pass
+
+
+class DataBatch(object):
+	"""
+	- 传感器数据批量缓存
+
+	数据以 0.1 为单位存入 int16 数组，采样时间以相对于批次开始时间的秒数存入 uint32 数组，
+	数组在初始化时一次性分配，缓存数据时不再分配内存
+
+	收集满 size 个数据，或者距离批次开始超过 period 毫秒之后 ready 为 True，
+	调用 flush() 生成一条消息并清空缓存
+
+	参数：
+	    size: 每批最多缓存的数据数量
+	    period: 每批最长的缓存时间（ms）
+	"""
+	SCALE = 10 # 保留一位小数
+
+	def __init__(self, size, period):
+		assert size > 0, DataBatchException("size must be > 0")
+
+		self.__values = array('h', [0] * size)
+		self.__offsets = array('I', [0] * size)
+		self.__period = period
+		self.__count = 0
+		self.__base_time = 0
+		self.__base_ticks = 0
+
+	def __len__(self):
+		return self.__count
+
+	@property
+	def ready(self):
+		if self.__count == 0:
+			return False
+
+		return self.__count >= len(self.__values) or ticks_diff(ticks_ms(), self.__base_ticks) >= self.__period
+
+	def append(self, value):
+		"""
+		缓存一个数据，缓存已满时返回 False
+		"""
+		if self.__count >= len(self.__values):
+			return False
+
+		if self.__count == 0:
+			self.__base_time = time()
+			self.__base_ticks = ticks_ms()
+
+		self.__values[self.__count] = int(round(value * self.SCALE))
+		self.__offsets[self.__count] = ticks_diff(ticks_ms(), self.__base_ticks) // 1000
+		self.__count += 1
+
+		return True
+
+	def flush(self, key):
+		"""
+		生成批量消息并清空缓存，形如：
+		    {"key": key, "time": 批次开始时间, "offsets": [0, 300, ...], "values": [25.1, 25.3, ...]}
+		"""
+		result = {
+			'key': key,
+			'time': self.__base_time,
+			'offsets': [self.__offsets[index] for index in range(self.__count)],
+			'values': [self.__values[index] / self.SCALE for index in range(self.__count)],
+		}
+
+		self.__count = 0
+
+		return result
@@ -0,0 +1,104 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import uasyncio as asyncio
+from utime import ticks_ms, ticks_diff
+from utils.utilities import Utilities
+
+
+class LinkMonitorException(BaseException):
+	pass
+
+
+class LinkMonitor(object):
+	"""
+	- wifi 连接监视
+
+	每隔 CHECK_PERIOD 毫秒读取一次 station.isconnected()，只读取驱动中的状态，不产生网络流量，
+	连续 DOWN_CONFIRM 次断开才认为连接已经断开，避免短暂波动引起不必要的恢复
+
+	连接状态变化时调用所有订阅者 callback(connected)，订阅者负责自己的恢复，
+	例如 MQTTService 在断开时按照 Recovery 策略重新连接 wifi 和服务器，不重启设备
+	"""
+	CHECK_PERIOD = 1000 # ms
+	DOWN_CONFIRM = 2
+
+	def __init__(self):
+		self.__callbacks = []
+		self.__task = None
+		self.__connected = True
+		self.__down_count = 0
+		self.__down_ticks = ticks_ms()
+
+		self.__counters = {
+			'drops': 0,
+			'last_outage': None, # 最近一次断开到恢复的时间（ms）
+		}
+
+	@property
+	def connected(self):
+		return self.__connected
+
+	def add_callback(self, f):
+		assert callable(f), LinkMonitorException("callback must be callable")
+
+		self.__callbacks.append(f)
+
+	def remove_callback(self, f):
+		if f in self.__callbacks:
+			self.__callbacks.remove(f)
+
+	def start(self):
+		if self.__task is None:
+			self.__task = asyncio.create_task(self.__check_task())
+
+	def stop(self):
+		if self.__task is not None:
+			self.__task.cancel()
+			self.__task = None
+
+	def stats(self):
+		result = {'connected': self.__connected}
+		result.update(self.__counters)
+
+		if not self.__connected:
+			result['down'] = ticks_diff(ticks_ms(), self.__down_ticks)
+
+		return result
+
+	def check(self):
+		"""
+		检查一次连接状态，状态变化时通知订阅者
+		"""
+		if Utilities.is_wifi_connected():
+			self.__down_count = 0
+
+			if not self.__connected:
+				self.__counters['last_outage'] = ticks_diff(ticks_ms(), self.__down_ticks)
+				self.__notify(True)
+		else:
+			self.__down_count += 1
+
+			if self.__connected and self.__down_count >= self.DOWN_CONFIRM:
+				self.__down_ticks = ticks_ms()
+				self.__counters['drops'] += 1
+				self.__notify(False)
+
+	def __notify(self, connected):
+		print("wifi link {}".format("up" if connected else "down"))
+
+		self.__connected = connected
+
+		for callback in self.__callbacks:
+			try:
+				callback(connected)
+			except Exception as e:
+				Utilities.log(self.__notify, str(e))
+
+	async def __check_task(self):
+		while True:
+			await asyncio.sleep_ms(self.CHECK_PERIOD)
+
+			self.check()
@@ -4,82 +4,256 @@ Copyright © 2021 Walkline Wang (https://walkline.wang)
 https://gitee.com/walkline/remote-wol-micropython
 """
 import gc
-from machine import Timer
-from utime import time
+import select
+import uerrno
+import ustruct
+import uasyncio as asyncio
+from utime import time, ticks_ms, ticks_us, ticks_diff
 from umqtt.simple import MQTTClient
 from utils.utilities import Utilities
+from utils.recovery import Recovery
+from utils.identity import Identity
+from .broker_pool import BrokerPool
+from .link_monitor import LinkMonitor
 from settings import Settings
 
 
+class MQTTServiceException(BaseException):
+	pass
+
+
 class MQTTService(object):
+	"""
+	- MQTT 服务
+
+	记录最后一次发送和接收数据的时间，只有连接真正空闲了 MQTT_KEEPALIVE 秒才发送 PINGREQ，
+	发送 PINGREQ 之后 PING_TIMEOUT 毫秒内没有收到任何数据，则认为连接已经断开
+
+	配置了多个服务器（MQTT_BROKERS）时，连接之前使用 BrokerPool 选择可用的服务器，
+	使用备用服务器期间定时探测主服务器，恢复后切回
+
+	连接之后使用 LinkMonitor 监视 wifi 连接，断开后几秒内开始恢复，不需要等待 PINGREQ 超时
+
+	QoS 1 消息发送之后不等待 PUBACK，最多同时保留 MAX_INFLIGHT 条等待确认的消息，
+	超过 RETRY_TIMEOUT 毫秒没有收到 PUBACK 则设置 DUP 标志重发，重新连接之后也会重发
+	"""
+	PING_TIMEOUT = 10 * 1000
+	MAX_INFLIGHT = 8
+	RETRY_TIMEOUT = 5 * 1000
+	MAX_MSGS_PER_CHECK = 8 # 每次 check_msg 最多处理的消息数量，避免一直占用事件循环
+
+	__PUBACK = 0x40
+
 	def __init__(self, sub_cb=None):
 		self.__client = None
 		self.__sub_cb = sub_cb
-		self.__heartbeat_timer = Timer(0)
-		self.__heartbeat_counter = 0
+		self.__keepalive_task = None
+		self.__failback_task = None
+		self.__poller = None
+		self.__last_send = ticks_ms()
+		self.__last_recv = ticks_ms()
+		self.__recv_us = ticks_us() # 开始读取最近一条消息的时间，用于统计处理耗时
+		self.__subscriptions = []
+		self.__reconnect_cb = None
+		self.__ack_cb = None
+		self.__pid = 0
+		self.__inflight = {} # pid: [topic, msg, retain, publish_ticks, send_ticks]
+		self.__recovery = Recovery(self.reconnect, Utilities.reassociate_wifi_async)
+		self.__link_monitor = LinkMonitor()
+		self.__link_monitor.add_callback(self.__link_cb)
+
+		# 旧的配置文件中没有 MQTT_BROKERS，为空时使用 MQTT_HOST 和 MQTT_PORT
+		self.__broker_pool = BrokerPool(
+			getattr(Settings, 'MQTT_BROKERS', None) or ((Settings.MQTT_HOST, Settings.MQTT_PORT),)
+		)
+
+		self.__delivery = {
+			'acked': 0,
+			'retransmitted': 0,
+			'last_latency': None,
+			'max_latency': 0,
+		}
 
 		self.__client = MQTTClient(
 			Settings.MQTT_CLIENT_ID,
-			Settings.MQTT_HOST,
-			Settings.MQTT_PORT,
+			self.__broker_pool.current[0],
+			self.__broker_pool.current[1],
 			Settings.MQTT_USERNAME,
 			Settings.MQTT_PASSWORD,
 			Settings.MQTT_KEEPALIVE,
 		)
 
-	def __heartbeat_cb(self, timer):
-		self.__heartbeat_counter += 1
+	async def __keepalive_cb(self):
+		keepalive = Settings.MQTT_KEEPALIVE * 1000
+
+		while True:
+			# 每次都根据最后发送时间计算下一次需要发送 PINGREQ 的时间
+			wait = keepalive - ticks_diff(ticks_ms(), self.__last_send)
+
+			if wait > 0:
+				await asyncio.sleep_ms(wait)
+				continue
 
-		if self.__heartbeat_counter >= Settings.MQTT_KEEPALIVE:
 			try:
-				self.__client.publish(b'{}/ping'.format(Settings.MQTT_USERNAME), b'ping')
-				self.__heartbeat_counter = 0
-			except OSError as ose:
-				err_msg = str(ose)
+				ping_ticks = ticks_ms()
+				self.ping()
 
+				await asyncio.sleep_ms(self.PING_TIMEOUT)
+
+				if ticks_diff(self.__last_recv, ping_ticks) < 0:
+					raise OSError(uerrno.ETIMEDOUT)
+			except OSError as ose:
 				print("err time:", time())
-				print(err_msg)
+				print(ose)
 
-				if err_msg in ("[Errno 104] ECONNRESET", "-1"):
-					try:
-						self.__client.disconnect()
-					except OSError:
-						pass
-					finally:
-						self.__client.connect()
-				elif err_msg == "[Errno 113] EHOSTUNREACH":
-					Utilities.hard_reset()
+				await self.recover(ose)
 
-		gc.collect()
+			gc.collect()
+
+	async def __failback_cb(self):
+		while True:
+			await asyncio.sleep_ms(BrokerPool.FAILBACK_PERIOD)
+
+			if self.__broker_pool.index == 0 or self.__recovery.recovering:
+				continue
+
+			try:
+				await self.__broker_pool.probe_async(0)
+			except OSError:
+				continue
+
+			try:
+				# 刚刚探测成功，直接连接主服务器，不再重新选择
+				await self.reconnect(0)
+			except OSError as ose:
+				await self.recover(ose)
+
+	def __link_cb(self, connected):
+		if not connected:
+			asyncio.create_task(self.recover(OSError(uerrno.EHOSTUNREACH)))
 
 	def deinit(self):
+		self.__link_monitor.stop()
+
+		if self.__keepalive_task is not None:
+			self.__keepalive_task.cancel()
+
+		if self.__failback_task is not None:
+			self.__failback_task.cancel()
+
 		self.__client.disconnect()
-		self.__heartbeat_timer.deinit()
 
 		self.__client = None
-		self.__heartbeat_timer = None
+		self.__keepalive_task = None
+		self.__failback_task = None
 
-	def connect(self, clean_session=True):
+	async def connect(self, clean_session=True, index=None):
+		"""
+		连接服务器，index 为 None 时使用 BrokerPool 异步探测并选择服务器，探测期间不阻塞其它任务
+		"""
 		# mqtt_client.set_last_will(b'walkline/last_will', b'offline')
 		self.__client.set_callback(self.__sub_cb)
-		self.__client.connect(clean_session=clean_session)
-		
-		self.__heartbeat_timer.init(
-			mode = Timer.PERIODIC,
-			period = 1000,
-			callback = self.__heartbeat_cb
-		)
+
+		if index is None:
+			index = await self.__broker_pool.select()
+
+		self.__client.server, self.__client.port = self.__broker_pool.broker(index)
+		connect_ticks = ticks_ms()
+
+		try:
+			self.__client.connect(clean_session=clean_session)
+		except OSError:
+			self.__broker_pool.failed(index)
+			raise
+
+		self.__broker_pool.connected(index, ticks_diff(ticks_ms(), connect_ticks))
+
+		self.__poller = select.poll()
+		self.__poller.register(self.__client.sock, select.POLLIN)
+		self.__last_send = self.__last_recv = ticks_ms()
+
+		if self.__keepalive_task is None and Settings.MQTT_KEEPALIVE > 0:
+			self.__keepalive_task = asyncio.create_task(self.__keepalive_cb())
+
+		if self.__failback_task is None and len(self.__broker_pool) > 1:
+			self.__failback_task = asyncio.create_task(self.__failback_cb())
+
+		self.__link_monitor.start()
 
 		print("mqtt forever loop")
 		print("now:", time())
 
-		username = Settings.MQTT_BIGIOT_USERNAME if bool(Settings.MQTT_IS_BIGIOT) else Settings.MQTT_CLIENT_ID
-
-		self.__client.subscribe(b'{}/{}'.format(username, Settings.MQTT_CLIENT_ID))
+		self.__client.subscribe('{}/{}'.format(Identity.username(), Settings.MQTT_CLIENT_ID).encode())
 
 	def disconnect(self):
 		self.__client.disconnect()
 
+	async def reconnect(self, index=None):
+		"""
+		重新连接服务器并恢复订阅，成功后调用 reconnect_cb，index 与 connect() 相同
+		"""
+		try:
+			# 启动时没有连接成功过，sock 为 None
+			if self.__client.sock is not None:
+				self.__client.disconnect()
+		except OSError:
+			try:
+				self.__client.sock.close()
+			except:
+				pass
+
+		await self.connect(index=index)
+
+		for topic, qos in self.__subscriptions:
+			self.__client.subscribe(topic, qos=qos)
+
+		for pid in self.__inflight:
+			self.__resend(pid)
+
+		if self.__reconnect_cb is not None:
+			self.__reconnect_cb()
+
+	async def recover(self, error):
+		"""
+		按照恢复策略处理网络错误，详情参考 Recovery
+		"""
+		await self.__recovery.recover(error)
+
+	@property
+	def recovery(self):
+		return self.__recovery
+
+	@property
+	def broker_pool(self):
+		return self.__broker_pool
+
+	@property
+	def link_monitor(self):
+		return self.__link_monitor
+
+	@property
+	def recv_us(self):
+		return self.__recv_us
+
+	@property
+	def inflight(self):
+		return len(self.__inflight)
+
+	def delivery_stats(self):
+		result = {'inflight': len(self.__inflight)}
+		result.update(self.__delivery)
+
+		return result
+
+	def set_reconnect_callback(self, f):
+		self.__reconnect_cb = f
+
+	def set_ack_callback(self, f):
+		"""
+		收到 PUBACK 时调用 f(pid, latency)，latency 为第一次发送到收到确认的时间（ms）
+		"""
+		self.__ack_cb = f
+
 	def set_callback(self, f):
 		self.__sub_cb = f
 		self.__client.set_callback(self.__sub_cb)
@@ -89,15 +263,123 @@ class MQTTService(object):
 
 	def ping(self):
 		self.__client.ping()
+		self.__last_send = ticks_ms()
 
 	def publish(self, topic, msg, retain=False, qos=0):
-		self.__client.publish(topic, msg, retain=retain, qos=qos)
+		"""
+		- 发布消息
+
+		qos 为 1 时只发送不等待 PUBACK，返回 packet id，
+		等待确认的消息已经达到 MAX_INFLIGHT 条时抛出 OSError(EAGAIN)
+		"""
+		if qos == 0:
+			self.__client.publish(topic, msg, retain=retain)
+			self.__last_send = ticks_ms()
+
+			return None
+
+		assert qos == 1, MQTTServiceException("qos 2 is not supported")
+
+		if len(self.__inflight) >= self.MAX_INFLIGHT:
+			raise OSError(uerrno.EAGAIN)
+
+		if isinstance(topic, str): topic = topic.encode()
+		if isinstance(msg, str): msg = msg.encode()
+
+		self.__pid = self.__pid % 65535 + 1
+
+		while self.__pid in self.__inflight:
+			self.__pid = self.__pid % 65535 + 1
+
+		self.__send_publish(self.__pid, topic, msg, retain, False)
+		self.__inflight[self.__pid] = [topic, msg, retain, self.__last_send, self.__last_send]
+
+		return self.__pid
 
 	def subscribe(self, topic, qos=0):
 		self.__client.subscribe(topic, qos=qos)
+		self.__last_send = ticks_ms()
+
+		if (topic, qos) not in self.__subscriptions:
+			self.__subscriptions.append((topic, qos))
 	
 	def wait_msg(self):
-		self.__client.wait_msg()
+		self.__wait_msg()
 	
 	def check_msg(self):
-		self.__client.check_msg()
+		"""
+		非阻塞处理已经收到的消息，每次最多处理 MAX_MSGS_PER_CHECK 条，用于 uasyncio 任务中，
+		同时重发超时未确认的 QoS 1 消息
+		"""
+		if self.__inflight:
+			self.__retransmit()
+
+		for _ in range(self.MAX_MSGS_PER_CHECK):
+			if not self.__poller.poll(0):
+				break
+
+			self.__wait_msg()
+
+	def __wait_msg(self):
+		# umqtt.simple 不处理 PUBACK，只返回报文类型，剩余的 3 个字节在这里读取
+		self.__recv_us = ticks_us()
+		op = self.__client.wait_msg()
+		self.__last_recv = ticks_ms()
+
+		if op == self.__PUBACK:
+			self.__puback(self.__client.sock.read(3))
+
+	def __puback(self, data):
+		pid = data[1] << 8 | data[2]
+		entry = self.__inflight.pop(pid, None)
+
+		if entry is None:
+			return
+
+		latency = ticks_diff(self.__last_recv, entry[3])
+
+		self.__delivery['acked'] += 1
+		self.__delivery['last_latency'] = latency
+		self.__delivery['max_latency'] = max(self.__delivery['max_latency'], latency)
+
+		if self.__ack_cb is not None:
+			self.__ack_cb(pid, latency)
+
+	def __retransmit(self):
+		now = ticks_ms()
+
+		for pid, entry in self.__inflight.items():
+			if ticks_diff(now, entry[4]) >= self.RETRY_TIMEOUT:
+				self.__resend(pid)
+
+	def __resend(self, pid):
+		entry = self.__inflight[pid]
+
+		self.__send_publish(pid, entry[0], entry[1], entry[2], True)
+		entry[4] = self.__last_send
+		self.__delivery['retransmitted'] += 1
+
+	def __send_publish(self, pid, topic, msg, retain, dup):
+		"""
+		按照 umqtt.simple 的格式组装 QoS 1 PUBLISH 报文
+		"""
+		packet = bytearray(b"\x32\0\0\0\0")
+		packet[0] |= (0x08 if dup else 0) | (1 if retain else 0)
+		size = 2 + len(topic) + 2 + len(msg)
+		index = 1
+
+		while size > 0x7f:
+			packet[index] = (size & 0x7f) | 0x80
+			size >>= 7
+			index += 1
+
+		packet[index] = size
+
+		sock = self.__client.sock
+		sock.write(packet, index + 1)
+		sock.write(ustruct.pack("!H", len(topic)))
+		sock.write(topic)
+		sock.write(ustruct.pack("!H", pid))
+		sock.write(msg)
+
+		self.__last_send = ticks_ms()
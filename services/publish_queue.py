@@ -0,0 +1,278 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import os
+import uerrno
+import ustruct
+import uasyncio as asyncio
+from utime import ticks_ms, ticks_diff
+
+
+class PublishQueueException(BaseException):
+	pass
+
+
+class PublishQueue(object):
+	"""
+	- 离线发布队列
+
+	位于调用者与 MQTTService.publish() 之间，服务器不可用时暂存消息：
+	    1. 消息先存入内存中的环形缓冲区
+	    2. 缓冲区满了之后追加写入 flash 中的文件，文件也满了则丢弃新消息
+	    3. 连接恢复后分批发送，并且限制每秒发送的消息数量
+
+	队列中已有消息时，新消息也会排在队尾，保证发送顺序
+
+	QoS 1 的等待确认窗口已满（MQTTService.publish() 抛出 EAGAIN）不是离线，消息存入队列但不抛出异常，
+	收到 PUBACK 之后立即按顺序发送，直到窗口再次填满，不受 MAX_RATE 限制
+
+	参数：
+	    client: MQTTService 对象
+	    ram_slots: 内存缓冲区大小，默认值 16
+	    spill_file: 溢出文件名，默认值 outbox.bin
+	    spill_limit: 溢出文件大小上限（字节），默认值 32KB
+	"""
+	DRAIN_PERIOD = 1000 # 检查队列的间隔时间（ms）
+	DRAIN_BATCH = 8 # 每批最多发送的消息数量
+	MAX_RATE = 5 # 每秒最多发送的消息数量
+
+	# flags(retain | qos << 1), topic length, msg length
+	__HEADER_FORMAT = "<BHH"
+	__HEADER_SIZE = ustruct.calcsize(__HEADER_FORMAT)
+
+	def __init__(self, client, ram_slots=16, spill_file="outbox.bin", spill_limit=32 * 1024):
+		assert client is not None, PublishQueueException("client must be specified")
+		assert ram_slots > 0, PublishQueueException("ram_slots must be > 0")
+
+		self.__client = client
+		self.__ring = [None] * ram_slots
+		self.__head = 0
+		self.__count = 0
+		self.__spill_file = spill_file
+		self.__spill_limit = spill_limit
+		self.__spill_offset = 0 # 溢出文件中下一条未读消息的位置
+		self.__spill_size = 0
+		self.__spilled = 0 # 溢出文件中未读消息的数量
+		self.__tokens = self.MAX_RATE
+		self.__tokens_ticks = ticks_ms()
+		self.__task = None
+
+		self.__counters = {
+			'sent': 0,
+			'queued': 0,
+			'dropped': 0,
+		}
+
+		self.__load_spill_file()
+
+		client.set_ack_callback(self.__ack_cb)
+
+	def start(self):
+		if self.__task is None:
+			self.__task = asyncio.create_task(self.__drain_task())
+
+	def deinit(self):
+		if self.__task is not None:
+			self.__task.cancel()
+			self.__task = None
+
+	@property
+	def depth(self):
+		return self.__count + self.__spilled
+
+	@property
+	def dropped(self):
+		return self.__counters['dropped']
+
+	def stats(self):
+		result = {'depth': self.depth, 'spilled': self.__spilled}
+		result.update(self.__counters)
+
+		return result
+
+	def publish(self, topic, msg, retain=False, qos=0):
+		"""
+		- 发布消息
+
+		队列为空时直接发送，发送失败时存入队列并重新抛出 OSError，以便调用者执行恢复策略；
+		等待确认窗口已满或者队列不为空时直接存入队列
+		"""
+		if self.depth == 0:
+			try:
+				self.__client.publish(topic, msg, retain=retain, qos=qos)
+				self.__counters['sent'] += 1
+
+				return
+			except OSError as ose:
+				self.__enqueue(topic, msg, retain, qos)
+
+				if ose.args[0] != uerrno.EAGAIN:
+					raise
+
+				return
+
+		self.__enqueue(topic, msg, retain, qos)
+
+	async def __drain_task(self):
+		while True:
+			await asyncio.sleep_ms(self.DRAIN_PERIOD)
+
+			if self.depth == 0 or self.__client.recovery.recovering:
+				continue
+
+			try:
+				self.__drain()
+			except OSError as ose:
+				await self.__client.recover(ose)
+
+	def __ack_cb(self, pid, latency):
+		"""
+		收到 PUBACK 之后窗口有了空位，立即发送队列中的消息
+		"""
+		if self.depth == 0 or self.__client.recovery.recovering:
+			return
+
+		while self.__send_head():
+			pass
+
+	def __drain(self):
+		"""
+		按照速率限制发送一批消息，消息发送成功之后才从队列中移除
+		"""
+		self.__refill_tokens()
+
+		for _ in range(self.DRAIN_BATCH):
+			if self.__tokens < 1 or not self.__send_head():
+				break
+
+			self.__tokens -= 1
+
+	def __send_head(self):
+		"""
+		发送队首的消息，队列为空或者等待确认窗口已满时返回 False，其它错误抛出 OSError
+		"""
+		if self.__count == 0 and not self.__load_spilled():
+			return False
+
+		topic, msg, retain, qos = self.__ring[self.__head]
+
+		try:
+			self.__client.publish(topic, msg, retain=retain, qos=qos)
+		except OSError as ose:
+			if ose.args[0] == uerrno.EAGAIN:
+				return False
+
+			raise
+
+		self.__ring[self.__head] = None
+		self.__head = (self.__head + 1) % len(self.__ring)
+		self.__count -= 1
+		self.__counters['sent'] += 1
+
+		return True
+
+	def __refill_tokens(self):
+		now = ticks_ms()
+		elapsed = ticks_diff(now, self.__tokens_ticks)
+
+		if elapsed > 0:
+			self.__tokens = min(self.MAX_RATE, self.__tokens + elapsed * self.MAX_RATE / 1000)
+			self.__tokens_ticks = now
+
+	def __enqueue(self, topic, msg, retain, qos):
+		self.__counters['queued'] += 1
+
+		if self.__spilled == 0 and self.__count < len(self.__ring):
+			self.__ring[(self.__head + self.__count) % len(self.__ring)] = (topic, msg, retain, qos)
+			self.__count += 1
+		else:
+			self.__spill(topic, msg, retain, qos)
+
+	def __spill(self, topic, msg, retain, qos):
+		if isinstance(topic, str): topic = topic.encode()
+		if isinstance(msg, str): msg = msg.encode()
+
+		size = self.__HEADER_SIZE + len(topic) + len(msg)
+
+		if self.__spill_size + size > self.__spill_limit:
+			self.__counters['dropped'] += 1
+			return
+
+		try:
+			with open(self.__spill_file, "ab") as file:
+				file.write(ustruct.pack(self.__HEADER_FORMAT, (1 if retain else 0) | (qos << 1), len(topic), len(msg)))
+				file.write(topic)
+				file.write(msg)
+
+			self.__spill_size += size
+			self.__spilled += 1
+		except OSError:
+			self.__counters['dropped'] += 1
+
+	def __load_spilled(self):
+		"""
+		内存缓冲区为空时，从溢出文件中读取消息填满缓冲区，文件读完后删除
+		"""
+		if self.__spilled == 0:
+			return False
+
+		try:
+			with open(self.__spill_file, "rb") as file:
+				file.seek(self.__spill_offset)
+
+				while self.__spilled > 0 and self.__count < len(self.__ring):
+					header = file.read(self.__HEADER_SIZE)
+
+					if len(header) < self.__HEADER_SIZE:
+						self.__spilled = 0
+						break
+
+					flags, topic_length, msg_length = ustruct.unpack(self.__HEADER_FORMAT, header)
+
+					self.__ring[(self.__head + self.__count) % len(self.__ring)] = (
+						file.read(topic_length),
+						file.read(msg_length),
+						bool(flags & 1),
+						flags >> 1
+					)
+					self.__count += 1
+					self.__spilled -= 1
+					self.__spill_offset += self.__HEADER_SIZE + topic_length + msg_length
+		except OSError:
+			self.__spilled = 0
+
+		if self.__spilled == 0:
+			self.__remove_spill_file()
+
+		return self.__count > 0
+
+	def __load_spill_file(self):
+		"""
+		统计重启之前留下的溢出消息
+		"""
+		try:
+			with open(self.__spill_file, "rb") as file:
+				while True:
+					header = file.read(self.__HEADER_SIZE)
+
+					if len(header) < self.__HEADER_SIZE:
+						break
+
+					flags, topic_length, msg_length = ustruct.unpack(self.__HEADER_FORMAT, header)
+					file.seek(topic_length + msg_length, 1)
+
+					self.__spill_size += self.__HEADER_SIZE + topic_length + msg_length
+					self.__spilled += 1
+		except OSError:
+			pass
+
+	def __remove_spill_file(self):
+		self.__spill_offset = 0
+		self.__spill_size = 0
+
+		try:
+			os.remove(self.__spill_file)
+		except OSError:
+			pass
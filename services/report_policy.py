@@ -0,0 +1,120 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+from utime import ticks_ms, ticks_diff
+
+
+class ReportPolicyException(BaseException):
+	pass
+
+
+class ReportPolicy(object):
+	"""
+	- 数据上报策略
+
+	每次采样调用 check(value)，需要上报时返回原因，否则返回 None：
+	    1. REASON_INITIAL: 第一个数据
+	    2. REASON_ALARM: 数据越过报警阈值（进入或者离开报警范围），不受 min_interval 限制
+	    3. REASON_CHANGE: 与上次上报的数据相差超过 deadband，且距离上次上报超过 min_interval
+	    4. REASON_HEARTBEAT: 距离上次上报超过 max_interval
+
+	deadband 为 0 且 min_interval 为 0 时每次采样都上报
+
+	报警使用 deadband 作为回差，进入报警范围之后，数据回到阈值以内超过 deadband 才解除报警，
+	避免数据在阈值附近波动时反复报警
+
+	参数：
+	    deadband: 死区，变化量小于该值时不上报
+	    min_interval: 两次上报之间的最短时间（ms）
+	    max_interval: 两次上报之间的最长时间（ms），0 为不限制
+	    alarm_low: 低于该值时报警，None 为不使用
+	    alarm_high: 高于该值时报警，None 为不使用
+	"""
+	REASON_INITIAL = "initial"
+	REASON_ALARM = "alarm"
+	REASON_CHANGE = "change"
+	REASON_HEARTBEAT = "heartbeat"
+
+	ALARM_LOW = "low"
+	ALARM_HIGH = "high"
+
+	def __init__(self, deadband=0, min_interval=0, max_interval=0, alarm_low=None, alarm_high=None):
+		assert deadband >= 0, ReportPolicyException("deadband must be >= 0")
+		assert max_interval == 0 or max_interval >= min_interval, ReportPolicyException("max_interval must be >= min_interval")
+		assert alarm_low is None or alarm_high is None or alarm_low < alarm_high, ReportPolicyException("alarm_low must be < alarm_high")
+
+		self.__deadband = deadband
+		self.__min_interval = min_interval
+		self.__max_interval = max_interval
+		self.__alarm_low = alarm_low
+		self.__alarm_high = alarm_high
+
+		self.__last_value = None
+		self.__last_ticks = 0
+		self.__alarm = None
+
+		self.__counters = {
+			'samples': 0,
+			'reports': 0,
+			'alarms': 0,
+		}
+
+	@property
+	def alarm(self):
+		"""
+		当前的报警状态，ALARM_LOW、ALARM_HIGH 或者 None
+		"""
+		return self.__alarm
+
+	@property
+	def counters(self):
+		return self.__counters
+
+	def check(self, value):
+		"""
+		检查一个采样数据，需要上报时记录上报时间并返回原因
+		"""
+		self.__counters['samples'] += 1
+
+		alarm = self.__alarm_state(value)
+		elapsed = ticks_diff(ticks_ms(), self.__last_ticks)
+
+		if self.__last_value is None:
+			reason = self.REASON_INITIAL
+		elif alarm != self.__alarm:
+			reason = self.REASON_ALARM
+			self.__counters['alarms'] += 1
+		elif elapsed < self.__min_interval:
+			reason = None
+		elif abs(value - self.__last_value) >= self.__deadband:
+			reason = self.REASON_CHANGE
+		elif self.__max_interval > 0 and elapsed >= self.__max_interval:
+			reason = self.REASON_HEARTBEAT
+		else:
+			reason = None
+
+		self.__alarm = alarm
+
+		if reason is not None:
+			self.__last_value = value
+			self.__last_ticks = ticks_ms()
+			self.__counters['reports'] += 1
+
+		return reason
+
+	def __alarm_state(self, value):
+		if self.__alarm_high is not None:
+			high = self.__alarm_high - self.__deadband if self.__alarm == self.ALARM_HIGH else self.__alarm_high
+
+			if value > high:
+				return self.ALARM_HIGH
+
+		if self.__alarm_low is not None:
+			low = self.__alarm_low + self.__deadband if self.__alarm == self.ALARM_LOW else self.__alarm_low
+
+			if value < low:
+				return self.ALARM_LOW
+
+		return None
@@ -0,0 +1,199 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+from array import array
+from math import sqrt
+from utime import time
+
+
+class SampleHistoryException(BaseException):
+	pass
+
+
+class SampleHistory(object):
+	"""
+	- 传感器数据环形缓存
+
+	最近 capacity 个数据以 0.1 为单位存入 int16 数组，采样时间（RTC 秒数）存入 uint32 数组，
+	数组在初始化时一次性分配，缓存已满时覆盖最早的数据
+
+	每个统计窗口维护窗口内数据的数量、和、平方和，添加数据和数据移出窗口时增量更新，
+	最小值和最大值只在移出的数据恰好是最小值或最大值时，才在查询时重新计算
+
+	参数：
+	    capacity: 最多缓存的数据数量
+	    windows: 统计窗口长度列表（秒）
+	"""
+	SCALE = 10 # 保留一位小数
+
+	def __init__(self, capacity, windows):
+		assert capacity > 0, SampleHistoryException("capacity must be > 0")
+		assert len(windows) > 0, SampleHistoryException("windows must be specified")
+
+		self.__values = array('h', [0] * capacity)
+		self.__times = array('I', [0] * capacity)
+		self.__capacity = capacity
+		self.__head = 0 # 已添加数据的总数，下一个数据的序号
+
+		self.__windows = tuple(windows)
+		count = len(self.__windows)
+
+		# 每个窗口的状态，tails 为窗口内最早数据的序号
+		self.__tails = [0] * count
+		self.__sums = [0] * count
+		self.__squares = [0] * count
+		self.__minimum = [0] * count
+		self.__maximum = [0] * count
+		self.__dirty = [False] * count
+
+	def __len__(self):
+		return min(self.__head, self.__capacity)
+
+	@property
+	def windows(self):
+		return self.__windows
+
+	def append(self, value, timestamp=None):
+		"""
+		添加一个数据，timestamp 为采样时间（秒），默认为当前时间
+		"""
+		timestamp = time() if timestamp is None else timestamp
+		value = int(round(value * self.SCALE))
+		oldest = self.__head - self.__capacity
+
+		# 缓存已满，即将被覆盖的数据先移出所有窗口
+		if oldest >= 0:
+			for window in range(len(self.__windows)):
+				if self.__tails[window] == oldest:
+					self.__remove(window)
+
+		index = self.__head % self.__capacity
+		self.__values[index] = value
+		self.__times[index] = timestamp
+		self.__head += 1
+
+		for window in range(len(self.__windows)):
+			if self.__tails[window] == self.__head - 1:
+				self.__minimum[window] = self.__maximum[window] = value
+				self.__dirty[window] = False
+			elif not self.__dirty[window]:
+				if value < self.__minimum[window]:
+					self.__minimum[window] = value
+
+				if value > self.__maximum[window]:
+					self.__maximum[window] = value
+
+			self.__sums[window] += value
+			self.__squares[window] += value * value
+
+		self.__expire(timestamp)
+
+	def stats(self, now=None):
+		"""
+		返回每个窗口的统计结果，窗口长度作为字符串键，形如：
+		    {"900": {"count": 3, "min": 25.1, "max": 25.6, "mean": 25.3, "stddev": 0.21}, ...}
+		"""
+		self.__expire(time() if now is None else now)
+
+		result = {}
+
+		for window, seconds in enumerate(self.__windows):
+			count = self.__head - self.__tails[window]
+
+			if count == 0:
+				result[str(seconds)] = {'count': 0}
+				continue
+
+			if self.__dirty[window]:
+				self.__refresh(window)
+
+			variance = max(0, self.__squares[window] * count - self.__sums[window] ** 2) / (count * count)
+
+			result[str(seconds)] = {
+				'count': count,
+				'min': self.__minimum[window] / self.SCALE,
+				'max': self.__maximum[window] / self.SCALE,
+				'mean': round(self.__sums[window] / count / self.SCALE, 2),
+				'stddev': round(sqrt(variance) / self.SCALE, 2),
+			}
+
+		return result
+
+	def history(self, seconds, points, now=None):
+		"""
+		返回最近 seconds 秒内的数据，超过 points 个时把相邻的数据合并为平均值，形如：
+		    {"time": 第一个数据的时间, "step": 1, "offsets": [0, 600, ...], "values": [25.1, 25.3, ...]}
+
+		offsets 为每组第一个数据相对于 time 的秒数，step 为每组合并的数据数量
+		"""
+		assert points > 0, SampleHistoryException("points must be > 0")
+
+		start = (time() if now is None else now) - seconds
+		first = max(0, self.__head - self.__capacity)
+
+		while first < self.__head and self.__time_of(first) <= start:
+			first += 1
+
+		count = self.__head - first
+		step = (count + points - 1) // points if count > 0 else 1
+		base_time = self.__time_of(first) if count > 0 else start
+		offsets = []
+		values = []
+
+		for group in range(first, self.__head, step):
+			end = min(group + step, self.__head)
+			total = 0
+
+			for seq in range(group, end):
+				total += self.__values[seq % self.__capacity]
+
+			offsets.append(self.__time_of(group) - base_time)
+			values.append(round(total / (end - group) / self.SCALE, 2))
+
+		return {
+			'time': base_time,
+			'step': step,
+			'offsets': offsets,
+			'values': values,
+		}
+
+	def __time_of(self, seq):
+		return self.__times[seq % self.__capacity]
+
+	def __expire(self, now):
+		"""
+		把超出窗口时间的数据移出窗口
+		"""
+		for window, seconds in enumerate(self.__windows):
+			while self.__tails[window] < self.__head and self.__time_of(self.__tails[window]) <= now - seconds:
+				self.__remove(window)
+
+	def __remove(self, window):
+		value = self.__values[self.__tails[window] % self.__capacity]
+
+		self.__sums[window] -= value
+		self.__squares[window] -= value * value
+		self.__tails[window] += 1
+
+		if value == self.__minimum[window] or value == self.__maximum[window]:
+			self.__dirty[window] = True
+
+	def __refresh(self, window):
+		"""
+		重新计算窗口内的最小值和最大值
+		"""
+		minimum = maximum = self.__values[self.__tails[window] % self.__capacity]
+
+		for seq in range(self.__tails[window] + 1, self.__head):
+			value = self.__values[seq % self.__capacity]
+
+			if value < minimum:
+				minimum = value
+			elif value > maximum:
+				maximum = value
+
+		self.__minimum[window] = minimum
+		self.__maximum[window] = maximum
+		self.__dirty[window] = False
@@ -6,11 +6,12 @@ https://gitee.com/walkline/remote-wol-micropython
 import gc
 from utils.utilities import Utilities
 from utils.wifihandler import WifiHandler
+from utils.identity import Identity
 from config import Config
 
 class WebSocketCallback(object):
 	def _OnWebSocketTextMsg(webSocket, msg):
-		global Utilities, WifiHandler, Config
+		global Utilities, WifiHandler, Identity, Config
 		import ujson
 
 		print('WebSocket text message: %s' % msg)
@@ -25,7 +26,7 @@ class WebSocketCallback(object):
 				identity_result.update(
 					hardware_version = Config.HARDWARE_VERSION,
 					hardware_name = Config.HARDWARE_NAME,
-					mac_address = WifiHandler.get_mac_address(),
+					mac_address = Identity.mac_address(),
 					ip_address = WifiHandler.get_ip_address()
 				)
 
@@ -34,6 +35,9 @@ class WebSocketCallback(object):
 				from utils.json_const import save_settings_result_success, save_settings_result_failed
 				from utils.settings_template import template
 
+				# mqtt_brokers 为可选参数，形如 [["host", port], ...]
+				params["mqtt_brokers"] = repr(tuple([(broker[0], int(broker[1])) for broker in params.get("mqtt_brokers", [])]))
+
 				settings = template.format(**params)
 				# print(settings)
 				with open("settings.py", "w") as file:
@@ -0,0 +1,73 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+对比导入时计算设备身份信息（MAC 地址、主题、上下线消息）的耗时：
+    legacy: 优化之前 HardwareConfig 和 Config.AP_SSID 中的计算方式
+    cold: Identity 每次启动第一次获取
+    cached: 同一次启动中再次获取
+
+在电脑上运行（需要开发板中已上传 utils 目录和 settings.py）：
+    mpremote run tools/bench_identity.py
+"""
+import json
+from utime import ticks_us, ticks_diff
+from utils.identity import Identity
+from utils.wifihandler import WifiHandler
+from config import Config
+from settings import Settings
+
+
+ROUNDS = 20
+
+
+def legacy():
+	ap_ssid = "{}{}".format(Config.AP_SSID_PREFIX, WifiHandler.get_mac_address())
+	username = Settings.MQTT_BIGIOT_USERNAME if bool(Settings.MQTT_IS_BIGIOT) else Settings.MQTT_CLIENT_ID
+	my_topic = '{}/remote_wol_device/{}'.format(username, WifiHandler.get_mac_address()).encode()
+
+	online_data = json.dumps({
+		'command': 'device_status_indicator',
+		'result': 'online',
+		'hardware_version': Config.HARDWARE_VERSION,
+		'hardware_name': Config.HARDWARE_NAME,
+		'mac_address': WifiHandler.get_mac_address(),
+		'ip_address': WifiHandler.get_ip_address(),
+	})
+
+	offline_data = json.dumps({
+		'command': 'device_status_indicator',
+		'result': 'offline',
+		'mac_address': WifiHandler.get_mac_address(),
+	})
+
+def identity():
+	ap_ssid = "{}{}".format(Config.AP_SSID_PREFIX, Identity.mac_address())
+	username = Identity.username()
+	my_topic = Identity.my_topic()
+	online_data = Identity.online_data()
+	offline_data = Identity.offline_data()
+
+def measure(func, setup=None):
+	total = 0
+
+	for _ in range(ROUNDS):
+		if setup is not None:
+			setup()
+
+		ticks_start = ticks_us()
+		func()
+		total += ticks_diff(ticks_us(), ticks_start)
+
+	return total / ROUNDS
+
+def run_test():
+	print("rounds: {}".format(ROUNDS))
+	print("legacy: {:>8.1f} us".format(measure(legacy)))
+	print("  cold: {:>8.1f} us".format(measure(identity, Identity.clear)))
+	print("cached: {:>8.1f} us".format(measure(identity)))
+
+
+if __name__ == "__main__":
+	run_test()
@@ -0,0 +1,99 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+测量每条 MQTT 消息的命令分发耗时，对比 if/elif 命令链、CommandRouter 以及先经过快速过滤的 CommandRouter
+
+在电脑上运行（需要开发板中已上传 hardware 和 utils 目录）：
+    mpremote run tools/bench_router.py
+"""
+import gc
+import json
+from utime import ticks_us, ticks_diff
+from utils.wifihandler import WifiHandler
+from hardware.command_router import CommandRouter
+
+
+ROUNDS = 200
+TOPIC = b'bench/remote_wol_device/' + WifiHandler.get_mac_address().encode()
+COMMANDS = (
+	'wake_up_pc', 'device_remove', 'sync_datetime', 'device_reboot',
+	'report_error_log', 'schedule_wake', 'cancel_wake', 'list_wakes',
+)
+
+
+def noop_handler(json_obj, result):
+	return result
+
+def legacy_dispatch(topic, msg):
+	"""
+	优化之前的 if/elif 命令链，仅用于对比，处理函数为空操作
+	"""
+	if topic != TOPIC:
+		return None
+
+	json_obj = json.loads(str(msg, "utf-8"))
+	command = json_obj['command']
+	general_result = {
+		'command': command + '_result',
+		'mac_address': json_obj['mac_address'],
+		'result': 'success'
+	}
+
+	if command == "wake_up_pc":
+		return general_result
+
+	for name in COMMANDS[1:]:
+		if command == name:
+			if json_obj['mac_address'] != WifiHandler.get_mac_address():
+				return None
+
+			return general_result
+
+	return None
+
+def measure(dispatch, msg):
+	gc.collect()
+
+	ticks_start = ticks_us()
+
+	for _ in range(ROUNDS):
+		dispatch(TOPIC, msg)
+
+	return ticks_diff(ticks_us(), ticks_start) / ROUNDS
+
+def run_test():
+	router = CommandRouter(TOPIC, WifiHandler.get_mac_address())
+
+	for command in COMMANDS:
+		router.register(command, noop_handler, device_only=command != 'wake_up_pc')
+
+	def filtered_dispatch(topic, msg):
+		if router.accepts(msg):
+			return router.dispatch(topic, msg)
+
+	messages = (
+		("first command", json.dumps({'command': 'wake_up_pc', 'mac_address': 'aabbccddeeff'})),
+		("last command", json.dumps({'command': 'list_wakes', 'mac_address': WifiHandler.get_mac_address()})),
+		("other device", json.dumps({'command': 'list_wakes', 'mac_address': 'aabbccddeeff'})),
+		("unknown", json.dumps({'command': 'unknown', 'mac_address': 'aabbccddeeff'})),
+	)
+
+	print("rounds: {}".format(ROUNDS))
+
+	for name, msg in messages:
+		msg = msg.encode()
+
+		print("{:>14}: legacy {:>8.1f} us/msg, router {:>8.1f} us/msg, filtered {:>8.1f} us/msg".format(
+			name,
+			measure(legacy_dispatch, msg),
+			measure(router.dispatch, msg),
+			measure(filtered_dispatch, msg)
+		))
+
+	print("router stats: {}".format(router.stats()))
+
+
+if __name__ == "__main__":
+	run_test()
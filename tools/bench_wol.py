@@ -0,0 +1,77 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+对比新旧 magic packet 构造方法的耗时与内存分配量
+
+在电脑上运行（需要开发板中已上传 utils 目录）：
+    mpremote run tools/bench_wol.py
+"""
+import gc
+import ustruct
+from utime import ticks_us, ticks_diff
+from utils.wol import create_magic_packet, clear_packet_cache, normalize_mac
+
+
+ROUNDS = 200
+MAC_ADDRESS = "aa:bb:cc:dd:ee:ff"
+
+
+def legacy_create_magic_packet(mac_address):
+	"""
+	优化之前的实现，仅用于对比
+	"""
+	mac = normalize_mac(mac_address)
+	data = b'FF' * 6 + (mac * 16).encode()
+	send_data = b''
+
+	for i in range(0, len(data), 2):
+		send_data = send_data + ustruct.pack(b'B', int(data[i: i + 2], 16))
+
+	return send_data
+
+def uncached_create_magic_packet(mac_address):
+	clear_packet_cache()
+
+	return create_magic_packet(mac_address)
+
+def measure(func):
+	"""
+	返回 (单次耗时 us, 单次分配字节数)，测量期间关闭自动垃圾回收
+	"""
+	gc.collect()
+	gc.disable()
+
+	try:
+		alloc_start = gc.mem_alloc()
+		ticks_start = ticks_us()
+
+		for _ in range(ROUNDS):
+			func(MAC_ADDRESS)
+
+		elapsed = ticks_diff(ticks_us(), ticks_start)
+		allocated = gc.mem_alloc() - alloc_start
+	finally:
+		gc.enable()
+		gc.collect()
+
+	return elapsed / ROUNDS, allocated / ROUNDS
+
+def run_test():
+	assert legacy_create_magic_packet(MAC_ADDRESS) == bytes(create_magic_packet(MAC_ADDRESS)),\
+		"packet mismatch"
+
+	print("rounds: {}".format(ROUNDS))
+
+	for name, func in (
+		("legacy", legacy_create_magic_packet),
+		("uncached", uncached_create_magic_packet),
+		("cached", create_magic_packet),
+	):
+		elapsed, allocated = measure(func)
+		print("{:>10}: {:>8.1f} us/call, {:>8.1f} bytes/call".format(name, elapsed, allocated))
+
+
+if __name__ == "__main__":
+	run_test()
@@ -0,0 +1,339 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+用于电脑上测试的最小 MQTT 服务器（MQTT 3.1.1），使用 CPython 运行：
+    python3 tools/host/broker.py [port]
+
+只实现设备用到的功能：
+    1. CONNECT、SUBSCRIBE、UNSUBSCRIBE、PINGREQ、DISCONNECT
+    2. PUBLISH QoS 0 和 QoS 1（回复 PUBACK），转发给订阅者时统一使用 QoS 0
+    3. 保留消息、遗嘱消息、主题通配符 + 和 #
+"""
+import socket
+import struct
+import sys
+import threading
+
+
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+PUBACK = 0x40
+SUBSCRIBE = 0x80
+SUBACK = 0x90
+UNSUBSCRIBE = 0xa0
+UNSUBACK = 0xb0
+PINGREQ = 0xc0
+PINGRESP = 0xd0
+DISCONNECT = 0xe0
+
+
+def topic_matches(topic_filter, topic):
+	filter_levels = topic_filter.split('/')
+	topic_levels = topic.split('/')
+
+	for index, level in enumerate(filter_levels):
+		if level == '#':
+			return True
+
+		if index >= len(topic_levels):
+			return False
+
+		if level != '+' and level != topic_levels[index]:
+			return False
+
+	return len(filter_levels) == len(topic_levels)
+
+def encode_length(length):
+	result = bytearray()
+
+	while True:
+		byte = length & 0x7f
+		length >>= 7
+		result.append(byte | 0x80 if length > 0 else byte)
+
+		if length == 0:
+			return bytes(result)
+
+def encode_string(value):
+	if isinstance(value, str):
+		value = value.encode()
+
+	return struct.pack("!H", len(value)) + value
+
+def publish_packet(topic, msg, retain=False):
+	body = encode_string(topic) + msg
+
+	return bytes([PUBLISH | (1 if retain else 0)]) + encode_length(len(body)) + body
+
+
+class _Session(object):
+	def __init__(self, broker, sock, address):
+		self.broker = broker
+		self.sock = sock
+		self.address = address
+		self.client_id = None
+		self.subscriptions = {} # topic filter: qos
+		self.will = None # (topic, msg, retain)
+		self.lock = threading.Lock()
+
+	def send(self, data):
+		with self.lock:
+			self.sock.sendall(data)
+
+	def recv_exactly(self, size):
+		data = b''
+
+		while len(data) < size:
+			chunk = self.sock.recv(size - len(data))
+
+			if not chunk:
+				raise ConnectionError("connection closed")
+
+			data += chunk
+
+		return data
+
+	def read_packet(self):
+		header = self.recv_exactly(1)[0]
+		length = 0
+		shift = 0
+
+		while True:
+			byte = self.recv_exactly(1)[0]
+			length |= (byte & 0x7f) << shift
+			shift += 7
+
+			if byte & 0x80 == 0:
+				break
+
+		return header, self.recv_exactly(length) if length > 0 else b''
+
+	def run(self):
+		clean = False
+
+		try:
+			while True:
+				header, body = self.read_packet()
+				packet_type = header & 0xf0
+
+				if packet_type == CONNECT:
+					self.on_connect(body)
+				elif packet_type == PUBLISH:
+					self.on_publish(header, body)
+				elif packet_type == SUBSCRIBE:
+					self.on_subscribe(body)
+				elif packet_type == UNSUBSCRIBE:
+					self.on_unsubscribe(body)
+				elif packet_type == PINGREQ:
+					self.send(bytes([PINGRESP, 0]))
+				elif packet_type == DISCONNECT:
+					clean = True
+					break
+		except (ConnectionError, OSError, IndexError):
+			pass
+		finally:
+			self.broker.remove_session(self)
+
+			try:
+				self.sock.close()
+			except OSError:
+				pass
+
+			if not clean and self.will is not None:
+				self.broker.route(*self.will)
+
+	def on_connect(self, body):
+		offset = 2 + struct.unpack_from("!H", body, 0)[0] # protocol name
+		offset += 1 # protocol level
+		flags = body[offset]
+		offset += 3 # flags, keepalive
+
+		self.client_id, offset = self.read_string(body, offset)
+
+		if flags & 0x04:
+			will_topic, offset = self.read_string(body, offset)
+			will_msg, offset = self.read_bytes(body, offset)
+			self.will = (will_topic, will_msg, bool(flags & 0x20))
+
+		self.broker.counters['connects'] += 1
+		self.send(bytes([CONNACK, 2, 0, 0]))
+
+	def on_publish(self, header, body):
+		qos = (header >> 1) & 0x03
+		topic, offset = self.read_string(body, 0)
+
+		if qos > 0:
+			pid = body[offset:offset + 2]
+			offset += 2
+			self.send(bytes([PUBACK, 2]) + pid)
+
+		self.broker.route(topic, body[offset:], bool(header & 0x01))
+
+	def on_subscribe(self, body):
+		pid = body[:2]
+		offset = 2
+		granted = bytearray()
+		topics = []
+
+		while offset < len(body):
+			topic_filter, offset = self.read_string(body, offset)
+			qos = min(body[offset], 1)
+			offset += 1
+
+			self.subscriptions[topic_filter] = qos
+			topics.append(topic_filter)
+			granted.append(qos)
+
+		self.send(bytes([SUBACK]) + encode_length(2 + len(granted)) + pid + bytes(granted))
+
+		for topic_filter in topics:
+			for topic, msg in self.broker.retained_messages(topic_filter):
+				self.send(publish_packet(topic, msg, True))
+
+	def on_unsubscribe(self, body):
+		offset = 2
+
+		while offset < len(body):
+			topic_filter, offset = self.read_string(body, offset)
+			self.subscriptions.pop(topic_filter, None)
+
+		self.send(bytes([UNSUBACK, 2]) + body[:2])
+
+	@staticmethod
+	def read_bytes(body, offset):
+		length = struct.unpack_from("!H", body, offset)[0]
+
+		return body[offset + 2:offset + 2 + length], offset + 2 + length
+
+	@staticmethod
+	def read_string(body, offset):
+		value, offset = _Session.read_bytes(body, offset)
+
+		return value.decode(), offset
+
+
+class Broker(object):
+	"""
+	- 最小 MQTT 服务器
+
+	每个连接使用一个线程，调用 stop() 时关闭所有连接，模拟服务器宕机
+
+	参数：
+	    host: 监听地址，默认值 127.0.0.1
+	    port: 监听端口，0 为自动分配
+	"""
+	def __init__(self, host="127.0.0.1", port=0):
+		self.__host = host
+		self.__port = port
+		self.__server = None
+		self.__sessions = []
+		self.__retained = {}
+		self.__lock = threading.Lock()
+
+		self.counters = {
+			'connects': 0,
+			'published': 0,
+			'delivered': 0,
+		}
+
+	@property
+	def port(self):
+		return self.__port
+
+	@property
+	def running(self):
+		return self.__server is not None
+
+	def start(self):
+		self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.__server.bind((self.__host, self.__port))
+		self.__server.listen(16)
+		self.__port = self.__server.getsockname()[1]
+
+		threading.Thread(target=self.__accept_loop, args=(self.__server,), daemon=True).start()
+
+		return self
+
+	def stop(self):
+		if self.__server is None:
+			return
+
+		try:
+			self.__server.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+
+		self.__server.close()
+		self.__server = None
+
+		with self.__lock:
+			sessions = list(self.__sessions)
+
+		for session in sessions:
+			try:
+				session.sock.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+
+	def route(self, topic, msg, retain=False):
+		with self.__lock:
+			self.counters['published'] += 1
+
+			if retain:
+				if msg:
+					self.__retained[topic] = msg
+				else:
+					self.__retained.pop(topic, None)
+
+			sessions = [
+				session for session in self.__sessions
+				if any(topic_matches(topic_filter, topic) for topic_filter in session.subscriptions)
+			]
+
+		packet = publish_packet(topic, msg)
+
+		for session in sessions:
+			try:
+				session.send(packet)
+				self.counters['delivered'] += 1
+			except OSError:
+				pass
+
+	def retained_messages(self, topic_filter):
+		with self.__lock:
+			return [(topic, msg) for topic, msg in self.__retained.items() if topic_matches(topic_filter, topic)]
+
+	def remove_session(self, session):
+		with self.__lock:
+			if session in self.__sessions:
+				self.__sessions.remove(session)
+
+	def __accept_loop(self, server):
+		while True:
+			try:
+				sock, address = server.accept()
+			except OSError:
+				break
+
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			session = _Session(self, sock, address)
+
+			with self.__lock:
+				self.__sessions.append(session)
+
+			threading.Thread(target=session.run, daemon=True).start()
+
+
+if __name__ == "__main__":
+	broker = Broker("0.0.0.0", int(sys.argv[1]) if len(sys.argv) > 1 else 1883).start()
+
+	print("broker listening on port {}".format(broker.port))
+
+	try:
+		threading.Event().wait()
+	except KeyboardInterrupt:
+		broker.stop()
@@ -0,0 +1,168 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+使用模拟的 onewire/ds18x20 模块检查 DS18B20 驱动不阻塞事件循环，使用 CPython 运行：
+    python3 tools/host/ds18b20_check.py
+
+检查步骤：
+    1. start_conversion() 和 collect() 的耗时都在 BUDGET_US 以内
+    2. 转换完成之前调用 collect() 抛出异常，不会读到上电默认值 85.0
+    3. 温度插件等待转换期间，事件循环中的其它任务仍然按时运行
+    4. 多个传感器共用一次 convert_temp()，ROM 列表只在初始化、读取失败和总线为空时扫描
+    5. 设置的精度写入暂存器，等待时间随精度缩短，读取结果不是上电默认值
+    6. 扫描时某个传感器写入精度失败不影响其它传感器，重新上电的传感器在读取时重新写入精度
+"""
+import sys
+import time
+
+from harness import setup_paths
+
+setup_paths()
+
+import uasyncio as asyncio
+import ds18x20
+from drivers.ds18b20 import DS18B20
+
+
+BUDGET_US = 1000 # 电脑上调用一次的耗时上限，只包含驱动本身的开销
+TICK_PERIOD = 50 # 模拟 MQTT 消息检查任务的间隔（ms）
+
+
+def check(name, condition):
+	print("{:<56} {}".format(name, "ok" if condition else "FAILED"))
+
+	if not condition:
+		sys.exit(1)
+
+def elapsed_us(func):
+	start = time.perf_counter_ns()
+	result = func()
+
+	return (time.perf_counter_ns() - start) // 1000, result
+
+async def ticker(ticks):
+	while True:
+		start = time.perf_counter()
+		await asyncio.sleep_ms(TICK_PERIOD)
+		ticks.append((time.perf_counter() - start) * 1000)
+
+async def check_event_loop(ds18b20):
+	ticks = []
+	task = asyncio.create_task(ticker(ticks))
+
+	await asyncio.sleep_ms(0)
+	await asyncio.sleep_ms(ds18b20.start_conversion())
+	value = ds18b20.collect()
+
+	task.cancel()
+
+	return value, ticks
+
+def check_probes():
+	rom_ids = ["28ff00000000000{}".format(index) for index in range(1, 4)]
+	ds18x20.ROMS = [bytearray(bytes.fromhex(rom_id)) for rom_id in rom_ids]
+	ds18x20.calls.update(scan=0, convert_temp=0, read_scratch=0)
+
+	ds18b20 = DS18B20(26)
+	values = [ds18b20.temperatures() for _ in range(2)]
+
+	check("readings keyed by ROM id", all(sorted(value) == rom_ids for value in values))
+	check("one scan for two readings", ds18x20.calls['scan'] == 1)
+	check("one convert_temp per reading for {} probes".format(len(rom_ids)), ds18x20.calls['convert_temp'] == 2)
+
+	ds18x20.FAILING = [ds18x20.ROMS[1]]
+	value = ds18b20.temperatures()
+	check("failed probe left out ({})".format(sorted(value)), sorted(value) == [rom_ids[0], rom_ids[2]])
+
+	ds18x20.FAILING = []
+	value = ds18b20.temperatures()
+	check("bus rescanned after a failure", ds18x20.calls['scan'] == 2 and len(value) == 3)
+
+	ds18x20.ROMS = []
+	check("empty bus returns no readings", ds18b20.scan() == [] and ds18b20.start_conversion() == 0 and ds18b20.collect() == {})
+
+def check_resolution():
+	ds18x20.ROMS = [bytearray(b'\x28\xff\x00\x00\x00\x00\x00\x01')]
+	ds18x20.calls.update(write_scratch=0)
+
+	ds18b20 = DS18B20(26, 9)
+	rom = ds18x20.ROMS[0]
+	start = time.perf_counter()
+	value = ds18b20.temperatures()
+	elapsed = (time.perf_counter() - start) * 1000
+
+	check("9 bit resolution written to the scratchpad", ds18b20._ds18b20.resolution(rom) == 9)
+	check("alarm registers kept", ds18b20._ds18b20.alarms(rom) == (0x4b, 0x46))
+	check("9 bit conversion waits {:.0f} ms".format(elapsed), ds18b20.conversion_time == 94 and elapsed < 200)
+	check("9 bit value read after conversion ({})".format(value), list(value.values()) == [ds18x20.TEMPERATURE])
+
+	ds18b20.scan()
+	check("unchanged resolution is not rewritten", ds18x20.calls['write_scratch'] == 1)
+
+	try:
+		DS18B20(26, 8)
+		refused = False
+	except AssertionError:
+		refused = True
+
+	check("unsupported resolution refused", refused)
+
+	ds18b20._ds18b20.power_cycle(rom)
+	value = ds18b20.temperatures()
+	check("power cycled probe left out ({})".format(value), value == {})
+	check("power cycled probe set back to 9 bit", ds18b20._ds18b20.resolution(rom) == 9)
+	value = ds18b20.temperatures()
+	check("9 bit value read after the rewrite ({})".format(value), list(value.values()) == [ds18x20.TEMPERATURE])
+
+def check_failed_write():
+	rom_ids = ["28ff00000000000{}".format(index) for index in range(1, 4)]
+	ds18x20.ROMS = [bytearray(bytes.fromhex(rom_id)) for rom_id in rom_ids]
+	ds18x20.FAILING = [ds18x20.ROMS[1]]
+
+	ds18b20 = DS18B20(26, 10)
+	resolutions = [ds18b20._ds18b20.resolution(rom) for rom in ds18x20.ROMS]
+
+	check("probes kept after a failed write ({})".format(len(ds18b20.rom_ids)), ds18b20.rom_ids == rom_ids)
+	check("other probes set to 10 bit ({})".format(resolutions), resolutions == [10, 12, 10])
+
+	ds18x20.FAILING = []
+	value = ds18b20.temperatures()
+	check("failed probe set to 10 bit on read", ds18b20._ds18b20.resolution(ds18x20.ROMS[1]) == 10)
+	check("failed probe left out until rewritten ({})".format(sorted(value)), sorted(value) == [rom_ids[0], rom_ids[2]])
+	check("all probes read afterwards", len(ds18b20.temperatures()) == 3)
+
+def run_test():
+	ds18b20 = DS18B20(26)
+
+	cost, wait = elapsed_us(ds18b20.start_conversion)
+	check("start_conversion() within {} us ({} us)".format(BUDGET_US, cost), cost <= BUDGET_US)
+	check("conversion wait is {} ms".format(wait), wait == ds18b20.conversion_time)
+
+	try:
+		ds18b20.collect()
+		early = False
+	except AssertionError:
+		early = True
+
+	check("collect() before the deadline is refused", early)
+
+	time.sleep(ds18b20.remaining() / 1000)
+
+	cost, value = elapsed_us(ds18b20.collect)
+	check("collect() within {} us ({} us)".format(BUDGET_US, cost), cost <= BUDGET_US)
+	check("value read after conversion ({})".format(value), list(value.values()) == [ds18x20.TEMPERATURE])
+
+	value, ticks = asyncio.run(check_event_loop(ds18b20))
+	check("event loop ran {} ticks during conversion".format(len(ticks)), len(ticks) >= ds18b20.conversion_time // TICK_PERIOD - 2)
+	check("longest tick {:.1f} ms".format(max(ticks)), max(ticks) < TICK_PERIOD * 2)
+	check("value read by the async path ({})".format(value), list(value.values()) == [ds18x20.TEMPERATURE])
+
+	check_probes()
+	check_resolution()
+	check_failed_write()
+
+
+if __name__ == "__main__":
+	run_test()
@@ -0,0 +1,138 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+使用两个本地 MQTT 服务器检查 BrokerPool 的切换与切回，使用 CPython 运行：
+    python3 tools/host/failover_check.py
+
+检查步骤：
+    1. 两个服务器都正常时选择主服务器
+    2. 主服务器停止后，在限定时间内切换到备用服务器
+    3. 主服务器恢复后，异步探测成功，重新选择主服务器
+    4. 主服务器无响应时，选择服务器期间其它任务仍然可以运行
+"""
+import socket
+import struct
+import sys
+import time
+
+from harness import setup_paths
+
+setup_paths()
+
+import uasyncio as asyncio
+from broker import Broker, encode_length, encode_string
+from services.broker_pool import BrokerPool
+
+
+def mqtt_connect(address, client_id="failover_check"):
+	"""
+	发送 CONNECT 报文，返回 CONNACK 的返回码
+	"""
+	body = encode_string("MQTT") + bytes([4, 2]) + struct.pack("!H", 60) + encode_string(client_id)
+
+	with socket.create_connection(address, timeout=2) as sock:
+		sock.sendall(bytes([0x10]) + encode_length(len(body)) + body)
+		connack = sock.recv(4)
+
+	assert connack[0] == 0x20, "unexpected response: {}".format(connack)
+
+	return connack[3]
+
+def connect(pool):
+	start = time.perf_counter()
+	index = asyncio.run(pool.select())
+	elapsed = int((time.perf_counter() - start) * 1000)
+
+	assert mqtt_connect(pool.broker(index)) == 0
+	pool.connected(index, elapsed)
+
+	return index, elapsed
+
+def stalled_listener():
+	"""
+	返回一个连接队列已满的监听 socket 和占满队列的客户端 socket
+	"""
+	listener = socket.socket()
+	listener.bind(("127.0.0.1", 0))
+	listener.listen(0)
+	fillers = []
+
+	for _ in range(3):
+		sock = socket.socket()
+		sock.setblocking(False)
+		sock.connect_ex(listener.getsockname())
+		fillers.append(sock)
+
+	time.sleep(0.2)
+
+	return listener, fillers
+
+async def select_with_ticker(pool):
+	"""
+	选择服务器的同时运行一个定时任务，返回选择结果和定时任务的最大间隔（ms）
+	"""
+	gaps = [0]
+
+	async def ticker():
+		last = time.perf_counter()
+
+		while True:
+			await asyncio.sleep_ms(10)
+			now = time.perf_counter()
+			gaps[0] = max(gaps[0], int((now - last) * 1000))
+			last = now
+
+	task = asyncio.create_task(ticker())
+	index = await pool.select()
+	task.cancel()
+
+	return index, gaps[0]
+
+def check(name, condition):
+	print("{:<48} {}".format(name, "ok" if condition else "FAILED"))
+
+	if not condition:
+		sys.exit(1)
+
+def run_test():
+	primary = Broker().start()
+	backup = Broker().start()
+	pool = BrokerPool((("127.0.0.1", primary.port), ("127.0.0.1", backup.port)))
+	bound = len(pool) * BrokerPool.PROBE_TIMEOUT
+
+	index, elapsed = connect(pool)
+	check("select primary when both are up", index == 0)
+
+	primary.stop()
+	index, elapsed = connect(pool)
+	check("switch to backup within {} ms ({} ms)".format(bound, elapsed), index == 1 and elapsed <= bound)
+	check("primary failure recorded", pool.stats()['brokers'][0]['failures'] == 1)
+	check("failed primary is tried last", pool.candidates() == [1, 0])
+
+	primary = Broker(port=primary.port).start()
+	latency = asyncio.run(pool.probe_async(0))
+	check("async probe sees primary again ({} ms)".format(latency), latency <= BrokerPool.PROBE_TIMEOUT)
+
+	index, elapsed = connect(pool)
+	check("fall back to primary", index == 0)
+	check("switch count", pool.stats()['switches'] == 2)
+
+	print(pool.stats())
+
+	# 连接队列已满且不 accept 的服务器，新的连接一直处于进行中，直到 PROBE_TIMEOUT
+	listener, fillers = stalled_listener()
+	stalled = BrokerPool((listener.getsockname(), ("127.0.0.1", backup.port)))
+	index, gap = asyncio.run(select_with_ticker(stalled))
+	check("select does not block the loop ({} ms gap)".format(gap), index == 1 and gap < 200)
+
+	for sock in fillers + [listener]:
+		sock.close()
+
+	primary.stop()
+	backup.stop()
+
+
+if __name__ == "__main__":
+	run_test()
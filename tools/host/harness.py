@@ -0,0 +1,57 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行设备代码的准备工作：
+    1. 把 shims 目录放在模块搜索路径最前面，代替 machine、network、umqtt.simple 等模块
+    2. 在临时目录中生成 settings.py 并切换工作目录，设备运行时写入的文件都保存在临时目录中
+"""
+import os
+import sys
+import tempfile
+
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+SHIMS_DIR = os.path.join(HOST_DIR, "shims")
+ROOT_DIR = os.path.dirname(os.path.dirname(HOST_DIR))
+
+
+def setup_paths():
+	for path in (ROOT_DIR, HOST_DIR, SHIMS_DIR):
+		if path in sys.path:
+			sys.path.remove(path)
+
+		sys.path.insert(0, path)
+
+def write_settings(port, client_id="harness", keepalive=60, brokers=(), workdir=None):
+	"""
+	使用 settings_template 生成 settings.py，返回工作目录
+	"""
+	setup_paths()
+
+	from utils.settings_template import template
+
+	workdir = workdir or tempfile.mkdtemp(prefix="remote_wol_")
+	settings = template.format(
+		wifi_ssid="harness",
+		wifi_password="",
+		mqtt_host="127.0.0.1",
+		mqtt_port=port,
+		mqtt_keepalive=keepalive,
+		mqtt_bigiot_username="",
+		mqtt_is_bigiot=0,
+		mqtt_client_id=client_id,
+		mqtt_username="",
+		mqtt_password="",
+		mqtt_data_point="temperature",
+		mqtt_brokers=repr(tuple(brokers)),
+	)
+
+	with open(os.path.join(workdir, "settings.py"), "w") as file:
+		file.write(settings)
+
+	os.chdir(workdir)
+	sys.path.insert(0, workdir)
+
+	return workdir
@@ -0,0 +1,65 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+检查没有 settings.py（首次启动进入 AP 模式配网）时可以导入 config 并获取设备身份，使用 CPython 运行：
+    python3 tools/host/identity_check.py
+
+检查步骤：
+    1. 没有 settings.py 时可以导入 config，AP_SSID 包含 MAC 地址
+    2. 没有 settings.py 时 WebSocket 的 identity 命令返回 MAC 地址
+    3. 生成 settings.py 之后，MQTT 用户名和主题使用 Settings 中的配置
+"""
+import json
+import os
+import sys
+import tempfile
+
+from harness import setup_paths, write_settings
+
+setup_paths()
+
+
+def check(name, condition):
+	print("{:<56} {}".format(name, "ok" if condition else "FAILED"))
+
+	if not condition:
+		sys.exit(1)
+
+
+class FakeWebSocket(object):
+	def __init__(self):
+		self.messages = []
+
+	def SendTextMessage(self, msg):
+		self.messages.append(json.loads(msg))
+
+
+def run_test():
+	workdir = tempfile.mkdtemp(prefix="remote_wol_")
+	os.chdir(workdir)
+
+	check("settings.py does not exist", not os.path.exists("settings.py") and "settings" not in sys.modules)
+
+	from utils.wifihandler import WifiHandler
+	mac_address = WifiHandler.get_mac_address()
+
+	from config import Config
+	check("import config without settings.py", Config.AP_SSID == Config.AP_SSID_PREFIX + mac_address)
+
+	from services.websocket_callback import WebSocketCallback
+	websocket = FakeWebSocket()
+	WebSocketCallback._OnWebSocketTextMsg(websocket, json.dumps({"command": "identity"}))
+	result = websocket.messages[-1] if websocket.messages else {}
+	check("identity command without settings.py", result.get("mac_address") == mac_address)
+
+	write_settings(1883, client_id="identity_check", workdir=workdir)
+
+	from utils.identity import Identity
+	check("username from settings.py", Identity.username() == "identity_check")
+	check("topic contains mac address", Identity.my_topic() == "identity_check/remote_wol_device/{}".format(mac_address).encode())
+
+
+if __name__ == "__main__":
+	run_test()
@@ -0,0 +1,236 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上测试设备处理 MQTT 命令的能力，使用 CPython 运行：
+    python3 tools/host/loadgen.py [--hardware Version0] [--rate 10] [--duration 10]
+                                  [--mix wake_up_pc=6,sync_datetime=2,list_wakes=1,report_stats=1]
+
+启动本地 MQTT 服务器和指定硬件版本的设备（hardware 目录中的代码不做修改，依赖的模块由 shims 代替），
+控制端按照指定速率和比例发送命令，统计：
+    1. 持续吞吐量（每秒收到的命令结果数量）
+    2. 从发送命令到收到结果的延迟百分位数
+    3. 预热之后设备代码（hardware、services、utils、drivers 目录）的内存增长，使用 tracemalloc 统计
+"""
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+
+from harness import ROOT_DIR, setup_paths, write_settings
+
+setup_paths()
+
+from broker import Broker
+from umqtt.simple import MQTTClient
+
+
+DEVICE_DIRS = ('hardware', 'services', 'utils', 'drivers')
+WAKE_TARGET = "aa:bb:cc:dd:ee:ff"
+
+
+def parse_mix(value):
+	mix = []
+
+	for item in value.split(','):
+		command, weight = item.split('=')
+		mix.append((command.strip(), int(weight)))
+
+	return mix
+
+def percentile(values, percent):
+	if not values:
+		return None
+
+	values = sorted(values)
+
+	return values[min(len(values) - 1, (len(values) * percent + 99) // 100 - 1)]
+
+def device_heap():
+	"""
+	设备代码当前占用的内存（字节）
+	"""
+	filters = [tracemalloc.Filter(True, os.path.join(ROOT_DIR, name, "*")) for name in DEVICE_DIRS]
+
+	return sum(stat.size for stat in tracemalloc.take_snapshot().filter_traces(filters).statistics('filename'))
+
+def build_command(command, mac_address, seq):
+	message = {'command': command, 'mac_address': mac_address, 'title': str(seq)}
+
+	if command == 'wake_up_pc':
+		# 目标使用本机地址，避免在电脑上发送广播
+		message.update(mac_address=WAKE_TARGET, host="127.0.0.1", port=9, repeats=1)
+	elif command == 'sync_datetime':
+		now = time.gmtime()
+		message['datetime'] = {
+			'year': now[0], 'month': now[1], 'day': now[2], 'weekday': now[6],
+			'hour': now[3], 'minute': now[4], 'second': now[5], 'millisecond': 0
+		}
+	elif command == 'list_wakes':
+		message['limit'] = 5
+
+	return json.dumps(message)
+
+
+class Controller(object):
+	"""
+	- 控制端
+
+	发送命令并接收结果，按照命令类型先进先出匹配发送时间，计算延迟
+	"""
+	def __init__(self, port, topic, mac_address):
+		self.__topic = topic
+		self.__mac_address = mac_address
+		self.__pending = collections.defaultdict(collections.deque)
+		self.__lock = threading.Lock()
+		self.latencies = []
+		self.sent = 0
+		self.received = 0
+		self.recording = False
+
+		self.__client = MQTTClient("loadgen", "127.0.0.1", port)
+		self.__client.set_callback(self.__sub_cb)
+		self.__client.connect()
+		self.__client.subscribe(topic)
+
+		self.__reader = threading.Thread(target=self.__read_loop, daemon=True)
+		self.__reader.start()
+
+	def send(self, command):
+		with self.__lock:
+			self.sent += 1
+			self.__pending[command].append(time.perf_counter())
+
+		self.__client.publish(self.__topic, build_command(command, self.__mac_address, self.sent))
+
+	def close(self):
+		try:
+			self.__client.disconnect()
+		except OSError:
+			pass
+
+	def __read_loop(self):
+		while True:
+			try:
+				self.__client.wait_msg()
+			except (OSError, IndexError, TypeError):
+				break
+
+	def __sub_cb(self, topic, msg):
+		received = time.perf_counter()
+
+		try:
+			command = json.loads(msg)['command']
+		except (ValueError, KeyError):
+			return
+
+		if not command.endswith('_result'):
+			return
+
+		with self.__lock:
+			pending = self.__pending[command[:-len('_result')]]
+
+			if not pending:
+				return
+
+			sent = pending.popleft()
+
+			if self.recording:
+				self.received += 1
+				self.latencies.append((received - sent) * 1000)
+
+
+async def run_device(args, broker):
+	import uasyncio as asyncio
+	from hardware import Selector
+	from hardware.device import HardwareConfig
+
+	topic = HardwareConfig.MY_TOPIC
+	mac_address = json.loads(HardwareConfig.DEVICE_STATUS_OFFLINE_DATA)['mac_address']
+
+	device = Selector.select(args.hardware)
+	device.setup()
+	await device.start()
+
+	controller = Controller(broker.port, topic, mac_address)
+	commands = [command for command, weight in args.mix for _ in range(weight)]
+	interval = 1 / args.rate
+	start = time.perf_counter()
+	warmup_end = start + args.warmup
+	end = warmup_end + args.duration
+	next_send = start
+	heap_start = None
+
+	while time.perf_counter() < end:
+		now = time.perf_counter()
+
+		if heap_start is None and now >= warmup_end:
+			heap_start = device_heap()
+			controller.recording = True
+
+		while next_send <= now:
+			controller.send(random.choice(commands))
+			next_send += interval
+
+		await asyncio.sleep_ms(5)
+
+	# 等待已发送命令的结果
+	await asyncio.sleep_ms(1000)
+
+	controller.recording = False
+	heap_end = device_heap()
+
+	controller.close()
+	device.stop()
+
+	return controller, heap_start, heap_end
+
+def run_test():
+	parser = argparse.ArgumentParser(description="MQTT command load generator")
+	parser.add_argument("--hardware", default="Version0")
+	parser.add_argument("--rate", type=float, default=10, help="commands per second")
+	parser.add_argument("--duration", type=float, default=10, help="measured seconds")
+	parser.add_argument("--warmup", type=float, default=2, help="seconds excluded from the results")
+	parser.add_argument("--mix", type=parse_mix, default=parse_mix("wake_up_pc=6,sync_datetime=2,list_wakes=1,report_stats=1"))
+	parser.add_argument("--verbose", action="store_true", help="show device output")
+	args = parser.parse_args()
+
+	tracemalloc.start()
+
+	broker = Broker().start()
+	workdir = write_settings(broker.port)
+
+	import uasyncio as asyncio
+
+	output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+	with output:
+		controller, heap_start, heap_end = asyncio.run(run_device(args, broker))
+
+	broker.stop()
+
+	print("hardware:   {}".format(args.hardware))
+	print("workdir:    {}".format(workdir))
+	print("offered:    {:.1f} cmd/s for {:.0f} s".format(args.rate, args.duration))
+	print("sustained:  {:.1f} cmd/s ({} results, {} commands sent)".format(
+		controller.received / args.duration, controller.received, controller.sent
+	))
+	print("latency:    p50 {} ms, p95 {} ms, p99 {} ms".format(
+		*["{:.1f}".format(value) if value is not None else "-" for value in (
+			percentile(controller.latencies, 50),
+			percentile(controller.latencies, 95),
+			percentile(controller.latencies, 99)
+		)]
+	))
+	print("heap:       {} -> {} bytes ({:+d})".format(heap_start, heap_end, heap_end - heap_start))
+
+
+if __name__ == "__main__":
+	run_test()
@@ -0,0 +1,85 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 ds18x20 模块，模拟总线上的传感器
+
+ROMS 为总线上的传感器列表，TEMPERATURE 为返回的温度，FAILING 中的传感器读取暂存器时抛出 CRC 错误，
+convert_temp() 之后按照暂存器中设置的精度等待 CONVERSION_TIMES 毫秒，之前读取会得到上电默认值 85.0，与真实传感器相同，
+power_cycle() 模拟传感器重新上电，暂存器恢复默认值
+
+调用次数保存在 calls 中，用于检查总线占用
+"""
+from utime import ticks_ms, ticks_diff
+
+
+ROMS = [bytearray(b'\x28\xff\x00\x00\x00\x00\x00\x01')]
+TEMPERATURE = 25.0
+CONVERSION_TIMES = {9: 94, 10: 188, 11: 375, 12: 750}
+POWER_ON_VALUE = 85.0
+FAILING = []
+
+calls = {'scan': 0, 'convert_temp': 0, 'read_scratch': 0, 'write_scratch': 0}
+
+
+class DS18X20(object):
+	def __init__(self, onewire):
+		self.ow = onewire
+		self.__convert_ticks = None
+		self.__scratch = {} # rom: [TH, TL, config]，上电默认 12 位精度
+
+	def scan(self):
+		calls['scan'] += 1
+
+		return [bytearray(rom) for rom in ROMS]
+
+	def convert_temp(self):
+		calls['convert_temp'] += 1
+
+		if not ROMS:
+			raise Exception("no presence")
+
+		self.__convert_ticks = ticks_ms()
+
+	def read_scratch(self, rom):
+		calls['read_scratch'] += 1
+
+		if bytes(rom) in [bytes(item) for item in FAILING]:
+			raise Exception("CRC error")
+
+		th, tl, config = self.__config(rom)
+		value = POWER_ON_VALUE
+
+		if self.__convert_ticks is not None and ticks_diff(ticks_ms(), self.__convert_ticks) >= CONVERSION_TIMES[(config >> 5) + 9]:
+			value = TEMPERATURE
+
+		value = int(value * 16) & 0xffff
+
+		return bytearray((value & 0xff, value >> 8, th, tl, config, 0xff, 0x0c, 0x10, 0x00))
+
+	def write_scratch(self, rom, buf):
+		calls['write_scratch'] += 1
+
+		self.__scratch[bytes(rom)] = tuple(buf)
+
+	def power_cycle(self, rom):
+		self.__scratch.pop(bytes(rom), None)
+
+	def resolution(self, rom):
+		return (self.__config(rom)[2] >> 5) + 9
+
+	def alarms(self, rom):
+		return self.__config(rom)[:2]
+
+	def read_temp(self, rom):
+		buf = self.read_scratch(rom)
+		value = buf[1] << 8 | buf[0]
+
+		if value & 0x8000:
+			value = -((value ^ 0xffff) + 1)
+
+		return value / 16
+
+	def __config(self, rom):
+		return self.__scratch.get(bytes(rom), (0x4b, 0x46, 0x7f))
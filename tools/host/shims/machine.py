@@ -0,0 +1,106 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 machine 模块，只实现项目中用到的部分
+"""
+import calendar
+import threading
+import time as _time
+
+
+class ResetError(SystemExit):
+	"""
+	调用 reset() 时抛出，由测试程序决定如何处理
+	"""
+	pass
+
+
+def reset():
+	raise ResetError("machine.reset()")
+
+def unique_id():
+	return b'\x24\x0a\xc4\x00\x00\x01'
+
+def freq(value=None):
+	return 240000000
+
+
+class Pin(object):
+	IN = 1
+	OUT = 3
+	OPEN_DRAIN = 7
+	PULL_UP = 1
+	PULL_DOWN = 2
+	IRQ_FALLING = 2
+	IRQ_RISING = 1
+
+	def __init__(self, id, mode=-1, pull=-1, value=None):
+		self.__id = id
+		self.__value = 0 if value is None else value
+		self.__handler = None
+
+	def init(self, mode=-1, pull=-1, value=None):
+		if value is not None:
+			self.__value = value
+
+	def value(self, value=None):
+		if value is None:
+			return self.__value
+
+		self.__value = 1 if value else 0
+
+	def on(self):
+		self.__value = 1
+
+	def off(self):
+		self.__value = 0
+
+	def irq(self, handler=None, trigger=None):
+		self.__handler = handler
+
+
+class Timer(object):
+	ONE_SHOT = 0
+	PERIODIC = 1
+
+	def __init__(self, id=-1):
+		self.__timer = None
+
+	def init(self, mode=PERIODIC, period=-1, callback=None):
+		self.deinit()
+
+		def run():
+			callback(self)
+
+			if mode == self.PERIODIC and self.__timer is not None:
+				self.__start(run, period)
+
+		self.__start(run, period)
+
+	def deinit(self):
+		if self.__timer is not None:
+			self.__timer.cancel()
+			self.__timer = None
+
+	def __start(self, run, period):
+		self.__timer = threading.Timer(period / 1000, run)
+		self.__timer.daemon = True
+		self.__timer.start()
+
+
+class RTC(object):
+	"""
+	修改时间时同时修改 utime.time() 的返回值
+	"""
+	def datetime(self, datetime=None):
+		import utime
+
+		if datetime is None:
+			t = utime.localtime()
+
+			return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+
+		year, month, day, weekday, hour, minute, second = datetime[:7]
+		utime.rtc_offset = calendar.timegm((year, month, day, hour, minute, second)) - int(_time.time())
@@ -0,0 +1,18 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 micropython 模块
+"""
+def const(value):
+	return value
+
+def alloc_emergency_exception_buf(size):
+	pass
+
+def schedule(func, arg):
+	func(arg)
+
+def mem_info(verbose=None):
+	pass
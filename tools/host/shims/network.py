@@ -0,0 +1,75 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 network 模块，station 始终处于已连接状态，
+使用本机回环地址
+"""
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_NO_AP_FOUND = 201
+STAT_WRONG_PASSWORD = 202
+STAT_BEACON_TIMEOUT = 200
+STAT_ASSOC_FAIL = 203
+STAT_HANDSHAKE_TIMEOUT = 204
+
+MAC_ADDRESS = b'\x24\x0a\xc4\x00\x00\x01'
+IFCONFIG = ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+
+class WLAN(object):
+	__interfaces = {}
+
+	def __new__(cls, interface=STA_IF):
+		if interface not in cls.__interfaces:
+			wlan = object.__new__(cls)
+			wlan.interface = interface
+			wlan.connected = interface == STA_IF
+			wlan.enabled = interface == STA_IF
+			wlan.settings = {'mac': MAC_ADDRESS}
+
+			cls.__interfaces[interface] = wlan
+
+		return cls.__interfaces[interface]
+
+	def active(self, active=None):
+		if active is None:
+			return self.enabled
+
+		self.enabled = bool(active)
+
+		if self.interface == STA_IF and not self.enabled:
+			self.connected = False
+
+	def connect(self, essid=None, password=None):
+		self.enabled = True
+		self.connected = True
+
+	def disconnect(self):
+		self.connected = False
+
+	def isconnected(self):
+		return self.connected
+
+	def status(self):
+		return STAT_GOT_IP if self.connected else STAT_IDLE
+
+	def ifconfig(self, config=None):
+		if config is not None:
+			return
+
+		if self.interface == STA_IF and not self.connected:
+			return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+
+		return IFCONFIG
+
+	def config(self, *args, **kwargs):
+		if args:
+			return self.settings[args[0]]
+
+		self.settings.update(kwargs)
@@ -0,0 +1,17 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 onewire 模块
+"""
+class OneWireError(Exception):
+	pass
+
+
+class OneWire(object):
+	def __init__(self, pin):
+		self.pin = pin
+
+	def reset(self, required=False):
+		return True
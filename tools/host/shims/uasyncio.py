@@ -0,0 +1,16 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 uasyncio 模块
+"""
+import asyncio as _asyncio
+from asyncio import *
+
+
+async def sleep_ms(ms):
+	await _asyncio.sleep(ms / 1000)
+
+async def wait_for_ms(awaitable, ms):
+	return await _asyncio.wait_for(awaitable, ms / 1000)
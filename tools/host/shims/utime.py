@@ -0,0 +1,48 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+
+在电脑上运行时代替 MicroPython 的 utime 模块
+"""
+import calendar
+import time as _time
+
+
+EPOCH_OFFSET = 946684800 # MicroPython 的时间从 2000-01-01 开始
+
+rtc_offset = 0 # 由 machine.RTC().datetime() 设置
+
+
+def ticks_ms():
+	return _time.perf_counter_ns() // 1000000
+
+def ticks_us():
+	return _time.perf_counter_ns() // 1000
+
+def ticks_diff(end, start):
+	return end - start
+
+def ticks_add(ticks, delta):
+	return ticks + delta
+
+def sleep(seconds):
+	_time.sleep(seconds)
+
+def sleep_ms(ms):
+	_time.sleep(ms / 1000)
+
+def sleep_us(us):
+	_time.sleep(us / 1000000)
+
+def time():
+	return int(_time.time()) + rtc_offset - EPOCH_OFFSET
+
+def localtime(seconds=None):
+	if seconds is None:
+		seconds = time()
+
+	return _time.gmtime(seconds + EPOCH_OFFSET)[:8]
+
+def mktime(datetime):
+	return calendar.timegm(tuple(datetime[:6])) - EPOCH_OFFSET
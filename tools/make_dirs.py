@@ -5,7 +5,7 @@ https://gitee.com/walkline/remote-wol-micropython
 """
 import os
 
-DIRS = ['drivers', 'hardware', 'services', 'utils']
+DIRS = ['drivers', 'hardware', 'hardware/plugins', 'services', 'utils']
 
 def mkdir(dir_name):
 	try:
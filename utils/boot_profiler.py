@@ -0,0 +1,65 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import json
+from array import array
+from utime import ticks_ms
+
+
+class BootProfiler(object):
+	"""
+	- 启动阶段计时
+
+	记录每个启动阶段结束时的 ticks_ms（即上电后经过的毫秒数），保存在固定数组中，
+	每个阶段只记录第一次，之后的调用（例如重新连接 wifi 或者 MQTT）不会覆盖
+
+	阶段：
+	    IMPORTS: main.py 导入模块
+	    SETTINGS: 检查配置文件
+	    WIFI: 连接 wifi
+	    SELECT: 选择硬件版本并加载插件
+	    CONNECT: 连接 MQTT 服务器
+	    SUBSCRIBE: 第一次订阅，此时开始可以接收命令
+	"""
+	IMPORTS = 0
+	SETTINGS = 1
+	WIFI = 2
+	SELECT = 3
+	CONNECT = 4
+	SUBSCRIBE = 5
+
+	PHASES = ('imports', 'settings', 'wifi', 'select', 'connect', 'subscribe')
+
+	__marks = array('i', [-1] * len(PHASES))
+
+	@staticmethod
+	def mark(phase):
+		if BootProfiler.__marks[phase] < 0:
+			BootProfiler.__marks[phase] = ticks_ms()
+
+	@staticmethod
+	def timeline():
+		"""
+		返回已记录阶段的 {阶段名称: 上电后的毫秒数}
+		"""
+		result = {}
+
+		for index, phase in enumerate(BootProfiler.PHASES):
+			if BootProfiler.__marks[index] >= 0:
+				result[phase] = BootProfiler.__marks[index]
+
+		return result
+
+	@staticmethod
+	def attach(data):
+		"""
+		在 json 格式的 bytes 消息中添加 boot 字段
+		"""
+		timeline = BootProfiler.timeline()
+
+		if not timeline:
+			return data
+
+		return data[:data.rindex(b'}')] + b', "boot": ' + json.dumps(timeline).encode() + b'}'
@@ -0,0 +1,91 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import json
+
+
+class Identity(object):
+	"""
+	- 设备身份信息
+
+	MAC 地址、MQTT 用户名、主题和上下线消息每次启动第一次使用时计算，保存在内存中，所有模块共用
+
+	MAC 地址只依赖 WifiHandler，没有 settings.py（首次启动进入 AP 模式配网）时也可以使用，
+	其它信息需要读取 Settings
+
+	上线消息包含 IP 地址，同样在第一次使用时生成
+	"""
+	__mac_address = None
+	__cache = None
+	__online_data = None
+
+	@staticmethod
+	def mac_address():
+		if Identity.__mac_address is None:
+			from .wifihandler import WifiHandler
+
+			Identity.__mac_address = WifiHandler.get_mac_address()
+
+		return Identity.__mac_address
+
+	@staticmethod
+	def username():
+		return Identity.__load()['username']
+
+	@staticmethod
+	def my_topic():
+		return Identity.__load()['my_topic']
+
+	@staticmethod
+	def offline_data():
+		return Identity.__load()['offline_data']
+
+	@staticmethod
+	def online_data():
+		if Identity.__online_data is None:
+			from config import Config
+			from .wifihandler import WifiHandler
+
+			Identity.__online_data = json.dumps({
+				'command': 'device_status_indicator',
+				'result': 'online',
+				'hardware_version': Config.HARDWARE_VERSION,
+				'hardware_name': Config.HARDWARE_NAME,
+				'mac_address': Identity.mac_address(),
+				'ip_address': WifiHandler.get_ip_address(),
+			}).encode()
+
+		return Identity.__online_data
+
+	@staticmethod
+	def clear():
+		"""
+		清空内存中的数据，下次使用时重新计算
+		"""
+		Identity.__mac_address = None
+		Identity.__cache = None
+		Identity.__online_data = None
+
+	@staticmethod
+	def __load():
+		if Identity.__cache is not None:
+			return Identity.__cache
+
+		from settings import Settings
+
+		mac_address = Identity.mac_address()
+		username = Settings.MQTT_BIGIOT_USERNAME if bool(Settings.MQTT_IS_BIGIOT) else Settings.MQTT_CLIENT_ID
+
+		Identity.__cache = {
+			'username': username,
+			'my_topic': '{}/remote_wol_device/{}'.format(username, mac_address).encode(),
+			'offline_data': json.dumps({
+				'command': 'device_status_indicator',
+				'result': 'offline',
+				'mac_address': mac_address,
+			}).encode(),
+		}
+
+		return Identity.__cache
@@ -0,0 +1,104 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+from array import array
+
+
+class LatencyStatsException(BaseException):
+	pass
+
+
+class LatencyStats(object):
+	"""
+	- 分阶段耗时统计
+
+	每个阶段使用一组固定边界的直方图，所有计数保存在初始化时分配的数组中，
+	记录耗时不分配内存，百分位数取所在区间的上边界
+
+	参数：
+	    stages: 阶段名称列表
+	"""
+	# 区间上边界（us），超过最后一个边界的计入溢出区间，百分位数取该阶段的最大值
+	BOUNDS = (
+		50, 100, 200, 500,
+		1000, 2000, 5000,
+		10000, 20000, 50000,
+		100000, 200000, 500000,
+		1000000,
+	)
+	PERCENTILES = (50, 95, 99)
+
+	def __init__(self, stages):
+		assert len(stages) > 0, LatencyStatsException("stages must be specified")
+
+		self.__stages = {}
+
+		for index, stage in enumerate(stages):
+			self.__stages[stage] = index
+
+		self.__width = len(self.BOUNDS) + 1
+		self.__buckets = array('I', [0] * (len(stages) * self.__width))
+		self.__maximum = array('I', [0] * len(stages))
+
+	def record(self, stage, elapsed_us):
+		index = self.__stages[stage]
+		bucket = 0
+
+		while bucket < len(self.BOUNDS) and elapsed_us > self.BOUNDS[bucket]:
+			bucket += 1
+
+		self.__buckets[index * self.__width + bucket] += 1
+
+		if elapsed_us > self.__maximum[index]:
+			self.__maximum[index] = elapsed_us
+
+	def reset(self):
+		for index in range(len(self.__buckets)):
+			self.__buckets[index] = 0
+
+		for index in range(len(self.__maximum)):
+			self.__maximum[index] = 0
+
+	def percentile(self, stage, percent):
+		"""
+		获取指定阶段的百分位数（us），没有记录时返回 None
+		"""
+		index = self.__stages[stage]
+		offset = index * self.__width
+		total = sum(self.__buckets[offset:offset + self.__width])
+
+		if total == 0:
+			return None
+
+		rank = (total * percent + 99) // 100
+		count = 0
+
+		for bucket in range(len(self.BOUNDS)):
+			count += self.__buckets[offset + bucket]
+
+			if count >= rank:
+				return min(self.BOUNDS[bucket], self.__maximum[index])
+
+		return self.__maximum[index]
+
+	def report(self):
+		"""
+		返回各阶段的统计结果，形如 {stage: {"count": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0}}
+		"""
+		result = {}
+
+		for stage, index in self.__stages.items():
+			offset = index * self.__width
+			item = {
+				'count': sum(self.__buckets[offset:offset + self.__width]),
+				'max': self.__maximum[index]
+			}
+
+			for percent in self.PERCENTILES:
+				item['p{}'.format(percent)] = self.percentile(stage, percent)
+
+			result[stage] = item
+
+		return result
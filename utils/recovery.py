@@ -0,0 +1,199 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import uerrno
+import uasyncio as asyncio
+from urandom import getrandbits
+from utime import time
+from .utilities import Utilities
+
+
+class RecoveryException(BaseException):
+	pass
+
+
+class Recovery(object):
+	"""
+	- 网络错误恢复策略
+
+	根据错误码（errno）选择恢复等级，同一等级连续失败超过限定次数后升级：
+	    1. TIER_RECONNECT: 重新连接 MQTT 服务器
+	    2. TIER_REASSOCIATE: 重新连接 wifi，然后重新连接 MQTT 服务器
+	    3. TIER_RESET: 重启设备，作为最后的手段
+
+	每次恢复之前按照带随机抖动的指数退避时间等待
+
+	恢复过程中抛出的其它异常（例如 MQTTException）同样视为一次失败，按照 TIER_RECONNECT 处理并继续升级，
+	不会传递给调用 recover() 的任务
+
+	参数：
+	    reconnect_cb: 重新连接 MQTT 服务器的协程函数，失败时抛出 OSError
+	    reassociate_cb: 重新连接 wifi 的协程函数，失败时抛出 OSError
+	"""
+	TIER_IGNORE = 0
+	TIER_RECONNECT = 1
+	TIER_REASSOCIATE = 2
+	TIER_RESET = 3
+
+	TIER_NAMES = ("ignore", "reconnect", "reassociate", "reset")
+
+	# 未列出的 OSError 从 TIER_RECONNECT 开始
+	ERRNO_TIERS = {
+		uerrno.EAGAIN: TIER_IGNORE,
+		-1: TIER_RECONNECT, # umqtt: connection closed by peer
+		uerrno.ECONNRESET: TIER_RECONNECT,
+		uerrno.ECONNABORTED: TIER_RECONNECT,
+		uerrno.ENOTCONN: TIER_RECONNECT,
+		uerrno.ETIMEDOUT: TIER_RECONNECT,
+		uerrno.EHOSTUNREACH: TIER_REASSOCIATE,
+	}
+
+	MAX_ATTEMPTS = (0, 3, 3) # 每个等级升级之前的尝试次数
+	BASE_DELAY = 1000 # ms
+	MAX_DELAY = 60 * 1000 # ms
+	STABLE_PERIOD = 2 * 60 # 恢复后稳定运行超过该时间（s），下次出错时从头开始，使用 time() 计时，避免 ticks_ms() 回绕
+
+	def __init__(self, reconnect_cb, reassociate_cb):
+		assert reconnect_cb is not None and reassociate_cb is not None,\
+			RecoveryException("reconnect_cb and reassociate_cb must be specified")
+
+		self.__reconnect_cb = reconnect_cb
+		self.__reassociate_cb = reassociate_cb
+		self.__tier = self.TIER_IGNORE
+		self.__attempts = 0
+		self.__failures = 0 # 连续失败次数，用于计算退避时间
+		self.__recovered_time = time()
+		self.__recovering = False
+
+		self.__counters = {
+			'errors': 0,
+			'ignored': 0,
+			'reconnect': 0,
+			'reassociate': 0,
+			'reset': 0,
+			'recovered': 0,
+			'last_errno': None,
+		}
+
+	@property
+	def counters(self):
+		return self.__counters
+
+	@property
+	def recovering(self):
+		return self.__recovering
+
+	@staticmethod
+	def get_errno(error):
+		"""
+		获取错误码，不是 OSError 时返回 None
+		"""
+		if isinstance(error, OSError) and len(error.args) > 0 and isinstance(error.args[0], int):
+			return error.args[0]
+
+		return None
+
+	def classify(self, error):
+		"""
+		根据错误码获取初始恢复等级
+		"""
+		errno = self.get_errno(error)
+
+		if errno is None:
+			return self.TIER_IGNORE
+
+		return self.ERRNO_TIERS.get(errno, self.TIER_RECONNECT)
+
+	async def recover(self, error):
+		"""
+		- 处理一个错误，直到恢复成功或者重启设备
+
+		其它任务同时调用时等待正在进行的恢复完成后直接返回
+		"""
+		self.__counters['errors'] += 1
+		self.__counters['last_errno'] = self.get_errno(error)
+
+		if self.__recovering:
+			while self.__recovering:
+				await asyncio.sleep_ms(100)
+
+			return
+
+		tier = self.classify(error)
+
+		if tier == self.TIER_IGNORE:
+			self.__counters['ignored'] += 1
+			return
+
+		if time() - self.__recovered_time >= self.STABLE_PERIOD:
+			self.__tier = self.TIER_IGNORE
+			self.__attempts = 0
+			self.__failures = 0
+
+		self.__recovering = True
+
+		try:
+			while True:
+				tier = self.__escalate(tier)
+				delay = self.__backoff()
+
+				print("recovery: errno {}, {} in {} ms".format(self.__counters['last_errno'], self.TIER_NAMES[tier], delay))
+
+				await asyncio.sleep_ms(delay)
+
+				try:
+					await self.__perform(tier)
+				except Exception as e:
+					self.__failures += 1
+					self.__counters['last_errno'] = self.get_errno(e)
+					tier = max(self.classify(e), self.TIER_RECONNECT)
+
+					if not isinstance(e, OSError):
+						Utilities.log(self.recover, str(e))
+
+					continue
+
+				self.__failures = 0
+				self.__recovered_time = time()
+				self.__counters['recovered'] += 1
+				break
+		finally:
+			self.__recovering = False
+
+	def __escalate(self, tier):
+		"""
+		合并当前等级与新错误的等级，当前等级尝试次数用完后升级
+		"""
+		if tier > self.__tier:
+			self.__tier = tier
+			self.__attempts = 0
+
+		if self.__tier < self.TIER_RESET and self.__attempts >= self.MAX_ATTEMPTS[self.__tier]:
+			self.__tier += 1
+			self.__attempts = 0
+
+		self.__attempts += 1
+
+		return self.__tier
+
+	def __backoff(self):
+		"""
+		指数退避时间，在 [delay / 2, delay) 之间随机抖动
+		"""
+		delay = min(self.BASE_DELAY << min(self.__failures, 16), self.MAX_DELAY)
+		half = delay // 2
+
+		return half + getrandbits(16) * half // 65536
+
+	async def __perform(self, tier):
+		self.__counters[self.TIER_NAMES[tier]] += 1
+
+		if tier == self.TIER_RESET:
+			Utilities.log(self.recover, "reset after errno {}".format(self.__counters['last_errno']))
+			Utilities.hard_reset()
+		elif tier == self.TIER_REASSOCIATE:
+			await self.__reassociate_cb()
+
+		await self.__reconnect_cb()
@@ -6,6 +6,7 @@ class Settings(object):
 
 	MQTT_HOST = "{mqtt_host}"
 	MQTT_PORT = {mqtt_port}
+	MQTT_BROKERS = {mqtt_brokers} # 按照优先级排列的 (host, port) 列表，为空时只使用 MQTT_HOST 和 MQTT_PORT
 	MQTT_KEEPALIVE = {mqtt_keepalive}
 	MQTT_BIGIOT_USERNAME = "{mqtt_bigiot_username}"
 	MQTT_IS_BIGIOT = {mqtt_is_bigiot}
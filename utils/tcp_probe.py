@@ -0,0 +1,71 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import socket
+import select
+import uerrno
+
+
+EISCONN = getattr(uerrno, "EISCONN", 127) # 默认的 uerrno 中没有 EISCONN，127 为 lwIP 中的值
+
+
+class TCPProbe(object):
+	"""
+	- 非阻塞 TCP 连接探测
+
+	创建时发起非阻塞连接，之后调用 check() 检查结果，socket 可写说明连接已经成功或者失败，
+	再次调用 connect() 获取结果，BrokerPool 和 WakeVerifier 共用
+
+	参数：
+	    address: socket.getaddrinfo() 返回的地址，连接立即失败时抛出 OSError
+	"""
+	def __init__(self, address):
+		self.__address = address
+		self.__connected = False
+		self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.__socket.setblocking(False)
+		self.__poller = select.poll()
+		self.__poller.register(self.__socket, select.POLLOUT)
+
+		try:
+			self.__socket.connect(address)
+			self.__connected = True
+		except OSError as ose:
+			if ose.args[0] != uerrno.EINPROGRESS:
+				self.close()
+				raise
+
+	def close(self):
+		if self.__socket is not None:
+			try:
+				self.__socket.close()
+			except OSError:
+				pass
+
+		self.__socket = None
+		self.__poller = None
+
+	def check(self):
+		"""
+		检查连接结果，不等待，连接成功时返回 True，仍在连接时返回 False，失败时抛出 OSError
+		"""
+		if self.__connected:
+			return True
+
+		if not self.__poller.poll(0):
+			return False
+
+		try:
+			self.__socket.connect(self.__address)
+		except OSError as ose:
+			if ose.args[0] in (uerrno.EINPROGRESS, uerrno.EALREADY):
+				return False
+
+			if ose.args[0] != EISCONN:
+				raise
+
+		self.__connected = True
+
+		return True
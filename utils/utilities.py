@@ -10,6 +10,7 @@ class Utilities(object):
 		使用硬件配置文件中的参数连接到 wifi 网络
 		"""
 		from .wifihandler import WifiHandler
+		from .boot_profiler import BootProfiler
 
 		try:
 			from settings import Settings
@@ -18,8 +19,45 @@ class Utilities(object):
 
 		result_code = WifiHandler.set_sta_mode(Settings.WIFI_SSID, Settings.WIFI_PASSWORD, timeout_sec)
 
+		if result_code == WifiHandler.STATION_CONNECTED:
+			BootProfiler.mark(BootProfiler.WIFI)
+
+		return result_code
+
+	@staticmethod
+	async def connect_to_internet_async(timeout_sec=600):
+		"""
+		与 connect_to_internet() 相同，等待期间不阻塞 uasyncio 事件循环
+		"""
+		from .wifihandler import WifiHandler
+		from .boot_profiler import BootProfiler
+
+		try:
+			from settings import Settings
+		except ImportError:
+			raise ImportError('Cannot found settings.py file')
+
+		result_code = await WifiHandler.set_sta_mode_async(Settings.WIFI_SSID, Settings.WIFI_PASSWORD, timeout_sec)
+
+		if result_code == WifiHandler.STATION_CONNECTED:
+			BootProfiler.mark(BootProfiler.WIFI)
+
 		return result_code
 
+	@staticmethod
+	async def reassociate_wifi_async(timeout_sec=30):
+		"""
+		断开并重新连接 wifi，不重启设备，失败时抛出 OSError(EHOSTUNREACH)
+		"""
+		import uerrno
+		from .wifihandler import WifiHandler
+		from settings import Settings
+
+		result_code = await WifiHandler.set_sta_mode_async(Settings.WIFI_SSID, Settings.WIFI_PASSWORD, timeout_sec, for_test=True)
+
+		if result_code != WifiHandler.STATION_CONNECTED:
+			raise OSError(uerrno.EHOSTUNREACH)
+
 	@staticmethod
 	def is_wifi_connected():
 		from .wifihandler import WifiHandler
@@ -0,0 +1,164 @@
+"""
+The MIT License (MIT)
+Copyright © 2021 Walkline Wang (https://walkline.wang)
+https://gitee.com/walkline/remote-wol-micropython
+"""
+import socket
+import uerrno
+import uasyncio as asyncio
+from utime import ticks_ms, ticks_diff
+from .tcp_probe import TCPProbe
+from .wol import WOLTarget
+
+
+class WakeVerifierException(BaseException):
+	pass
+
+
+class _Probe(object):
+	def __init__(self, address, timeout_ms, context):
+		self.address = address
+		self.timeout_ms = timeout_ms
+		self.context = context
+		self.start_ticks = ticks_ms()
+		self.attempt_ticks = 0
+		self.tcp = None
+		self.task = None
+
+	def close(self):
+		if self.tcp is not None:
+			self.tcp.close()
+
+		self.tcp = None
+
+
+class WakeVerifier(object):
+	"""
+	- 唤醒结果验证
+
+	发送 magic packet 之后，定时使用非阻塞的 TCP 连接探测目标电脑是否上线：
+	    1. 连接成功，说明端口开放，电脑已上线
+	    2. 连接被拒绝（收到 RST），说明电脑已经响应了 ARP 和 TCP，同样视为已上线
+
+	每个探测都是一个 uasyncio 任务，每次只检查 socket 状态，不会阻塞 MQTT 消息接收任务
+
+	参数：
+	    result_cb: 结果回调函数，形如 result_cb(context, online, latency)，
+	               online 为是否上线，latency 为从唤醒到上线的耗时（ms）
+	"""
+	DEFAULT_PORT = 445
+	DEFAULT_TIMEOUT = 180 # seconds
+	MAX_TIMEOUT = 30 * 60 # seconds
+	POLL_PERIOD = 500
+	ATTEMPT_TIMEOUT = 3000 # 单次连接尝试的超时时间，超时后重新建立连接
+	MAX_PROBES = 8
+
+	__REACHABLE_ERRORS = (uerrno.ECONNREFUSED, uerrno.ECONNRESET)
+
+	def __init__(self, result_cb):
+		assert result_cb is not None, WakeVerifierException("result_cb must be specified")
+
+		self.__result_cb = result_cb
+		self.__probes = []
+
+	def deinit(self):
+		for probe in self.__probes:
+			probe.task.cancel()
+			probe.close()
+
+		self.__probes = []
+
+	def add(self, host, port=DEFAULT_PORT, timeout=DEFAULT_TIMEOUT, context=None):
+		"""
+		- 添加一个探测任务
+
+		参数来自 MQTT 消息，host 只接受点分十进制的 IPv4 地址，不解析域名，避免在消息处理中阻塞，
+		参数不正确时抛出 ValueError
+
+		参数：
+		    host: 目标电脑的 IP 地址
+		    port: 探测端口，默认值 445
+		    timeout: 超时时间（秒），默认值 180，最大 MAX_TIMEOUT
+		    context: 原样传递给结果回调函数
+		"""
+		if host == WOLTarget.DIRECTED_BROADCAST:
+			raise ValueError('Incorrect host: {}'.format(host))
+
+		host = WOLTarget.check_host(host)
+		port = self.__check_int('port', port, 1, 65535)
+		timeout = self.__check_int('timeout', timeout, 1, self.MAX_TIMEOUT)
+
+		if len(self.__probes) >= self.MAX_PROBES:
+			raise WakeVerifierException("too many pending probes")
+
+		address = socket.getaddrinfo(host, port)[0][-1]
+		probe = _Probe(address, timeout * 1000, context)
+		probe.task = asyncio.create_task(self.__probe_task(probe))
+
+		self.__probes.append(probe)
+
+	@property
+	def pending(self):
+		return len(self.__probes)
+
+	@staticmethod
+	def __check_int(name, value, minimum, maximum):
+		try:
+			number = None if isinstance(value, bool) else int(value)
+		except (TypeError, ValueError):
+			number = None
+
+		if number is None or not minimum <= number <= maximum:
+			raise ValueError('Incorrect {}: {}'.format(name, value))
+
+		return number
+
+	async def __probe_task(self, probe):
+		# 任务因为任何原因结束时都要移除探测，避免占用 MAX_PROBES
+		try:
+			while True:
+				await asyncio.sleep_ms(self.POLL_PERIOD)
+
+				latency = ticks_diff(ticks_ms(), probe.start_ticks)
+
+				if self.__check(probe):
+					self.__finish(probe, True, latency)
+					break
+				elif latency >= probe.timeout_ms:
+					self.__finish(probe, False, latency)
+					break
+		finally:
+			probe.close()
+
+			if probe in self.__probes:
+				self.__probes.remove(probe)
+
+	def __finish(self, probe, online, latency):
+		probe.close()
+		self.__probes.remove(probe)
+
+		try:
+			self.__result_cb(probe.context, online, latency)
+		except Exception as e:
+			print("WakeVerifier result_cb error:", e)
+
+	def __check(self, probe):
+		"""
+		检查一次探测结果，目标已上线时返回 True
+		"""
+		if probe.tcp is not None and ticks_diff(ticks_ms(), probe.attempt_ticks) >= self.ATTEMPT_TIMEOUT:
+			probe.close()
+
+		try:
+			if probe.tcp is None:
+				probe.attempt_ticks = ticks_ms()
+				probe.tcp = TCPProbe(probe.address)
+
+			return probe.tcp.check()
+		except OSError as ose:
+			if ose.args[0] in self.__REACHABLE_ERRORS:
+				return True
+
+			probe.close()
+
+			return False
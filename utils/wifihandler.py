@@ -77,6 +77,28 @@ class WifiHandler(object):
 	def set_sta_mode(essid, password, timeout_sec=600, for_test=False):
 		from utime import sleep_ms
 
+		for delay in WifiHandler.__connecting(essid, password, timeout_sec, for_test):
+			sleep_ms(delay)
+
+		return WifiHandler.__connected_status()
+
+	@staticmethod
+	async def set_sta_mode_async(essid, password, timeout_sec=600, for_test=False):
+		"""
+		与 set_sta_mode() 相同，等待期间不阻塞 uasyncio 事件循环
+		"""
+		import uasyncio as asyncio
+
+		for delay in WifiHandler.__connecting(essid, password, timeout_sec, for_test):
+			await asyncio.sleep_ms(delay)
+
+		return WifiHandler.__connected_status()
+
+	@staticmethod
+	def __connecting(essid, password, timeout_sec, for_test):
+		"""
+		连接指定的 wifi 网络，需要等待时 yield 等待时长（ms），由调用者决定如何等待
+		"""
 		station = network.WLAN(network.STA_IF)
 		# ifconfig = ("192.168.0.180", "255.255.255.0", "192.168.0.25", "192.168.0.1")
 
@@ -85,7 +107,7 @@ class WifiHandler(object):
 		if for_test:
 			station.active(False)
 
-			sleep_ms(500)
+			yield 500
 
 		if not station.isconnected():
 			# station.ifconfig(ifconfig)
@@ -110,8 +132,11 @@ class WifiHandler(object):
 					pass
 
 				retry_count += 1
-				sleep_ms(500)
+				yield 500
 
+	@staticmethod
+	def __connected_status():
+		station = network.WLAN(network.STA_IF)
 		status_code = station.status()
 
 		print(__station_status_message[status_code])
@@ -129,6 +154,22 @@ class WifiHandler(object):
 
 		return station_ip if station_ip != "0.0.0.0" else access_point_ip
 
+	@staticmethod
+	def get_broadcast_address():
+		"""
+		根据 station 的 IP 地址和子网掩码计算子网广播地址，未连接时返回 255.255.255.255
+		"""
+		station = network.WLAN(network.STA_IF)
+		ip_address, netmask = station.ifconfig()[:2]
+
+		if ip_address == "0.0.0.0":
+			return "255.255.255.255"
+
+		ip_address = ip_address.split(".")
+		netmask = netmask.split(".")
+
+		return ".".join([str(int(ip_address[i]) | (~int(netmask[i]) & 0xff)) for i in range(4)])
+
 	@staticmethod
 	def get_mac_address():
 		access_point = network.WLAN(network.AP_IF)
@@ -4,9 +4,24 @@ Copyright © 2021 Walkline Wang (https://walkline.wang)
 https://gitee.com/walkline/remote-wol-micropython
 """
 import socket
-import ustruct
+import uasyncio as asyncio
+from ubinascii import unhexlify
+from utime import ticks_us, ticks_diff
 
-def wake_on_lan(mac_address):
+
+MAGIC_PACKET_SIZE = 6 + 16 * 6
+MAGIC_PACKET_CACHE_SIZE = 8 # 缓存的 magic packet 数量上限
+
+__packet_cache = {}
+__packet_cache_keys = [] # 按加入顺序记录缓存键，用于淘汰最早的记录
+
+
+def normalize_mac(mac_address):
+	"""
+	将 MAC 地址统一为 12 位小写十六进制字符串
+
+	支持 `aabbccddeeff` 以及 `aa:bb:cc:dd:ee:ff`、`aa-bb-cc-dd-ee-ff` 格式
+	"""
 	if len(mac_address) == 12:
 		pass
 	elif len(mac_address) == 12 + 5:
@@ -15,18 +30,295 @@ def wake_on_lan(mac_address):
 	else:
 		raise ValueError('Incorrect MAC address format')
 
-	send_data = __create_magic_packet(mac_address)
+	return mac_address.lower()
+
+def create_magic_packet(mac_address, password=None):
+	"""
+	获取指定 MAC 地址的 magic packet，相同 MAC 地址直接返回缓存结果
+
+	参数：
+	    mac_address: 目标电脑的 MAC 地址
+	    password: 可选的 SecureOn 密码，格式与 MAC 地址相同，将追加在 packet 末尾
+	"""
+	key = normalize_mac(mac_address)
+
+	if password is not None:
+		password = normalize_mac(password)
+		key += password
+
+	packet = __packet_cache.get(key)
+
+	if packet is None:
+		try:
+			mac = unhexlify(key[:12])
+			secure_on = unhexlify(password) if password is not None else b''
+		except ValueError:
+			raise ValueError('Incorrect MAC address format')
+
+		packet = __fill_magic_packet(bytearray(MAGIC_PACKET_SIZE + len(secure_on)), mac)
+		packet[MAGIC_PACKET_SIZE:] = secure_on
+
+		if len(__packet_cache_keys) >= MAGIC_PACKET_CACHE_SIZE:
+			del __packet_cache[__packet_cache_keys.pop(0)]
+
+		__packet_cache[key] = packet
+		__packet_cache_keys.append(key)
+
+	return packet
+
+def clear_packet_cache():
+	__packet_cache.clear()
+	__packet_cache_keys.clear()
+
+def wake_on_lan(target):
+	sender = WOLSender()
+
+	try:
+		sender.send(target)
+	finally:
+		sender.deinit()
 
-	sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-	sock.sendto(send_data, ('255.255.255.255', 9))  # ok
-	
 	print("magic packet sent!")
 
-def __create_magic_packet(mac):
-	data = b'FF' * 6 + (mac * 16).encode()
-	send_data = b''
+def __fill_magic_packet(packet, mac):
+	"""
+	使用 6 字节 MAC 地址填充预先分配好的 packet，过程中不产生新的对象
+	"""
+	view = memoryview(packet)
+
+	for index in range(6):
+		view[index] = 0xff
+
+	for offset in range(6, MAGIC_PACKET_SIZE, 6):
+		view[offset:offset + 6] = mac
+
+	return packet
+
+
+class WOLTarget(object):
+	"""
+	- 网络唤醒目标
+
+	参数：
+	    mac_address: 目标电脑的 MAC 地址
+	    host: 发送地址，默认值 LIMITED_BROADCAST，可以是：
+	        LIMITED_BROADCAST: 255.255.255.255
+	        DIRECTED_BROADCAST: 根据当前网络配置计算出的子网广播地址
+	        其它 IPv4 地址（点分十进制）: 子网广播地址或者单播地址，不支持域名
+	    port: 发送端口，通常为 7 或 9，默认值 9
+	    password: 可选的 SecureOn 密码
+	"""
+	LIMITED_BROADCAST = '255.255.255.255'
+	DIRECTED_BROADCAST = 'directed'
+	DEFAULT_PORT = 9
+
+	def __init__(self, mac_address, host=LIMITED_BROADCAST, port=DEFAULT_PORT, password=None):
+		if not isinstance(port, int) or not 0 < port < 65536:
+			raise ValueError('Incorrect port: {}'.format(port))
+
+		self.mac_address = normalize_mac(mac_address)
+		self.host = self.check_host(host or self.LIMITED_BROADCAST)
+		self.port = port
+		self.password = normalize_mac(password) if password else None
+
+	@staticmethod
+	def parse(spec, defaults=None):
+		"""
+		- 从 MQTT 消息中解析唤醒目标
+
+		参数：
+		    spec: MAC 地址字符串，或者形如 {"mac_address": "", "host": "", "port": 9, "password": ""} 的字典
+		    defaults: 可选的字典，为 spec 中缺少的字段提供默认值
+		"""
+		if isinstance(spec, WOLTarget):
+			return spec
+
+		if not isinstance(spec, dict):
+			spec = {'mac_address': spec}
+
+		def field(name, default=None):
+			value = spec.get(name)
+
+			if value is None and defaults is not None:
+				value = defaults.get(name)
+
+			return default if value is None else value
+
+		return WOLTarget(
+			spec['mac_address'],
+			field('host', WOLTarget.LIMITED_BROADCAST),
+			field('port', WOLTarget.DEFAULT_PORT),
+			field('password')
+		)
+
+	@staticmethod
+	def check_host(host):
+		"""
+		检查发送地址是否为 DIRECTED_BROADCAST 或者点分十进制的 IPv4 地址
+		"""
+		if host == WOLTarget.DIRECTED_BROADCAST:
+			return host
+
+		parts = host.split('.') if isinstance(host, str) else ()
+
+		if len(parts) != 4 or not all(part.isdigit() and len(part) <= 3 and int(part) < 256 for part in parts):
+			raise ValueError('Incorrect host: {}'.format(host))
+
+		return host
+
+	@property
+	def packet(self):
+		return create_magic_packet(self.mac_address, self.password)
+
+	def address(self, directed_broadcast=None):
+		"""
+		获取发送地址元组，directed_broadcast 为当前子网广播地址
+		"""
+		host = self.host
+
+		if host == self.DIRECTED_BROADCAST:
+			if directed_broadcast is None:
+				from .wifihandler import WifiHandler
+
+				directed_broadcast = WifiHandler.get_broadcast_address()
+
+			host = directed_broadcast
+
+		return (host, self.port)
+
+
+class WOLSender(object):
+	"""
+	- 网络唤醒发送器
+
+	持有一个长期使用的广播 socket，所有唤醒请求共用，使用完毕后调用 deinit() 关闭
+
+	发送轮数和间隔来自 MQTT 消息，使用前由 check_rounds() 检查并限制在 MAX_REPEATS、MAX_SPACING 以内
+	"""
+	MAX_REPEATS = 10
+	MAX_SPACING = 1000 # ms
+
+	def __init__(self):
+		self.__socket = None
+
+	def deinit(self):
+		if self.__socket is not None:
+			try:
+				self.__socket.close()
+			except OSError:
+				pass
+
+			self.__socket = None
+
+	def send(self, target):
+		"""
+		发送一次 magic packet，target 为 MAC 地址字符串或者 WOLTarget 对象
+		"""
+		target = WOLTarget.parse(target)
+
+		self.__get_socket().sendto(target.packet, target.address())
+
+	@staticmethod
+	def check_rounds(repeats, spacing_ms=0):
+		"""
+		检查发送轮数和间隔的类型，并限制在允许的范围内，返回 (repeats, spacing_ms)
+		"""
+		for name, value in (('repeats', repeats), ('spacing', spacing_ms)):
+			if not isinstance(value, int) or isinstance(value, bool):
+				raise ValueError('Incorrect {}: {}'.format(name, value))
+
+		return (
+			min(max(repeats, 1), WOLSender.MAX_REPEATS),
+			min(max(spacing_ms, 0), WOLSender.MAX_SPACING)
+		)
+
+	def wake_many(self, targets, repeats=3, sent_cb=None):
+		"""
+		- 批量唤醒
+
+		每一轮向所有目标各发送一次，共发送 repeats 轮，各轮之间没有间隔，
+		需要间隔时使用 wake_many_async()
+
+		参数：
+		    targets: MAC 地址字符串或者 WOLTarget 对象列表
+		    repeats: 发送轮数，默认值 3
+		    sent_cb: 每次发送完成后调用 sent_cb(ticks_us)，用于统计耗时
+
+		返回值：
+		    [(mac_address, send_us, error), ...]，send_us 为该目标所有发送操作的累计耗时，
+		    error 为发送失败时的错误信息，成功时为 None，某个目标发送失败不影响其它目标，之后的轮次跳过该目标
+		"""
+		repeats, _ = self.check_rounds(repeats)
+		targets, packets, addresses, timings, errors = self.__prepare(targets)
+
+		for _ in range(repeats):
+			self.__send_round(packets, addresses, timings, errors, sent_cb)
+
+		return self.__results(targets, timings, errors)
+
+	async def wake_many_async(self, targets, repeats=3, spacing_ms=0, sent_cb=None):
+		"""
+		与 wake_many() 相同，两轮之间等待 spacing_ms 毫秒，等待期间不阻塞 uasyncio 事件循环
+		"""
+		repeats, spacing_ms = self.check_rounds(repeats, spacing_ms)
+		targets, packets, addresses, timings, errors = self.__prepare(targets)
+
+		for count in range(repeats):
+			if count > 0 and spacing_ms > 0:
+				await asyncio.sleep_ms(spacing_ms)
+
+			self.__send_round(packets, addresses, timings, errors, sent_cb)
+
+		return self.__results(targets, timings, errors)
+
+	def __prepare(self, targets):
+		"""
+		解析全部目标并生成 packet 和发送地址，避免发送到一半时报错
+		"""
+		targets = [WOLTarget.parse(target) for target in targets]
+		packets = [target.packet for target in targets]
+		directed_broadcast = None
+
+		for target in targets:
+			if target.host == WOLTarget.DIRECTED_BROADCAST:
+				from .wifihandler import WifiHandler
+
+				directed_broadcast = WifiHandler.get_broadcast_address()
+				break
+
+		addresses = [target.address(directed_broadcast) for target in targets]
+
+		return targets, packets, addresses, [0] * len(targets), [None] * len(targets)
+
+	def __results(self, targets, timings, errors):
+		return [(targets[index].mac_address, timings[index], errors[index]) for index in range(len(targets))]
+
+	def __send_round(self, packets, addresses, timings, errors, sent_cb):
+		sock = self.__get_socket()
+
+		for index in range(len(packets)):
+			if errors[index] is not None:
+				continue
+
+			start = ticks_us()
+
+			try:
+				sock.sendto(packets[index], addresses[index])
+			except OSError as ose:
+				errors[index] = str(ose)
+				continue
+
+			end = ticks_us()
+			timings[index] += ticks_diff(end, start)
+
+			if sent_cb is not None:
+				sent_cb(end)
+
+	def __get_socket(self):
+		if self.__socket is None:
+			self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
-	for i in range(0, len(data), 2):
-		send_data = send_data + ustruct.pack(b'B', int(data[i: i + 2], 16))
+			if hasattr(socket, 'SO_BROADCAST'):
+				self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
-	return send_data
+		return self.__socket